@@ -0,0 +1,97 @@
+"""
+Shared pytest fixtures
+
+test_dashboard.py and test_live_api.py are manual scripts that call the
+live government API, so they are not collected.
+"""
+
+import pandas as pd
+import pytest
+
+collect_ignore = ['test_dashboard.py', 'test_live_api.py']
+
+SITES = {
+    1: {'site_name': 'Alpha Fuel', 'site_brand': 'Shell', 'address': '1 Main St',
+        'suburb': 'Southport', 'postcode': 4215, 'latitude': -27.97, 'longitude': 153.41},
+    2: {'site_name': 'Bravo Fuel', 'site_brand': 'BP', 'address': '2 High St',
+        'suburb': 'Southport', 'postcode': 4215, 'latitude': -27.98, 'longitude': 153.40},
+    3: {'site_name': 'Charlie Fuel', 'site_brand': 'Ampol', 'address': '3 Gympie Rd',
+        'suburb': 'Chermside', 'postcode': 4032, 'latitude': -27.38, 'longitude': 153.03},
+}
+
+
+@pytest.fixture
+def make_changes():
+    """
+    Build a frame shaped like QLDFuelPriceAPI._clean_historical_data output
+
+    Takes (site_id, fuel_type, 'YYYY-MM-DD HH:MM:SS', price_dollars) tuples;
+    site metadata comes from SITES, overridden per call with ``sites``.
+    """
+
+    def build(changes, sites=None):
+        sites = {**SITES, **(sites or {})}
+        df = pd.DataFrame([{
+            'site_id': site_id,
+            **sites[site_id],
+            'fuel_type': fuel_type,
+            'price': price * 1000,
+            'price_dollars': price,
+            'transaction_date': pd.Timestamp(at),
+        } for site_id, fuel_type, at, price in changes])
+        df['date'] = df['transaction_date'].dt.date
+        return df.sort_values('transaction_date', ascending=False).reset_index(drop=True)
+
+    return build
+
+
+class FakeLiveClient:
+    """
+    Serves live API payloads from editable lists and counts calls per endpoint
+
+    Sites 1 and 2 are in Southport (Gold Coast) and site 3 in Chermside
+    (Brisbane); both regions roll up to Queensland.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.sites = [
+            {'S': site_id, 'N': f'Site {site_id}', 'B': 5, 'A': f'{site_id} Main St', 'P': postcode,
+             'G1': suburb, 'G2': region, 'Lat': -27.9, 'Lng': 153.4}
+            for site_id, postcode, suburb, region in ((1, 4215, 10, 20), (2, 4215, 10, 20), (3, 4032, 11, 21))
+        ]
+        self.regions = [
+            {'GeoRegionLevel': 1, 'GeoRegionId': 10, 'Name': 'Southport', 'GeoRegionParentId': 20},
+            {'GeoRegionLevel': 1, 'GeoRegionId': 11, 'Name': 'Chermside', 'GeoRegionParentId': 21},
+            {'GeoRegionLevel': 2, 'GeoRegionId': 20, 'Name': 'Gold Coast', 'GeoRegionParentId': 30},
+            {'GeoRegionLevel': 2, 'GeoRegionId': 21, 'Name': 'Brisbane', 'GeoRegionParentId': 30},
+            {'GeoRegionLevel': 3, 'GeoRegionId': 30, 'Name': 'Queensland', 'GeoRegionParentId': 0},
+        ]
+        self.prices = [
+            {'SiteId': 1, 'FuelId': 2, 'Price': 1899, 'TransactionDateUtc': '2025-01-06T01:00:00'},
+            {'SiteId': 2, 'FuelId': 2, 'Price': 1859, 'TransactionDateUtc': '2025-01-06T02:00:00'},
+        ]
+
+    def _serve(self, name, payload):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return payload
+
+    def get_site_details(self, priority=None):
+        return self._serve('sites', {'S': [dict(site) for site in self.sites]})
+
+    def get_fuel_types(self, priority=None):
+        return self._serve('fuels', {'Fuels': [{'FuelId': 2, 'Name': 'Unleaded'}, {'FuelId': 3, 'Name': 'Diesel'}]})
+
+    def get_brands(self, priority=None):
+        return self._serve('brands', {'Brands': [{'BrandId': 5, 'Name': 'Shell'}]})
+
+    def get_geographic_regions(self, priority=None):
+        return self._serve('regions', {'GeographicRegions': [dict(region) for region in self.regions]})
+
+    def get_site_prices(self, priority=None):
+        return self._serve('prices', {'SitePrices': [dict(price) for price in self.prices]})
+
+
+@pytest.fixture
+def live_client():
+    return FakeLiveClient()
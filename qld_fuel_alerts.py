@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Indexed price-alert evaluation.
+
+Subscriptions ("tell me when Diesel in Southport drops below $1.80", or within
+a radius of a point) are indexed by (fuel_type, suburb) and by (fuel_type, geo
+cell), with thresholds kept sorted. Each ingested price change looks up only
+its own buckets and binary-searches the thresholds, so evaluation cost follows
+the number of changes and triggered alerts, not the number of subscriptions.
+"""
+
+import bisect
+import itertools
+import json
+import math
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Geo cell size in degrees (~11 km north-south)
+CELL_DEGREES = 0.1
+EARTH_RADIUS_KM = 6371.0
+
+# Change feeds with independent fired/re-armed state
+FEED_LIVE = 'live'
+FEED_REPLAY = 'replay'
+
+
+def _finite(value) -> bool:
+    """A real number that is not NaN or infinite"""
+    try:
+        return value is not None and math.isfinite(value)
+    except TypeError:
+        return False
+
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+@dataclass
+class AlertSubscription:
+    """A user's threshold on one fuel type, by suburb or by radius around a point"""
+    fuel_type: str
+    threshold: float
+    suburb: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+    subscriber: Optional[str] = None
+    subscription_id: int = 0
+    created: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def validate(self):
+        if not self.fuel_type or not isinstance(self.fuel_type, str):
+            raise ValueError("fuel_type is required")
+        if not _finite(self.threshold) or self.threshold <= 0:
+            raise ValueError("threshold must be a positive price in dollars")
+        if self.suburb is not None and not isinstance(self.suburb, str):
+            raise ValueError("suburb must be a string")
+        geo = (self.latitude, self.longitude, self.radius_km)
+        if self.suburb is None and any(value is None for value in geo):
+            raise ValueError("Either suburb or latitude, longitude and radius_km are required")
+        if self.suburb is None:
+            if not all(_finite(value) for value in geo):
+                raise ValueError("latitude, longitude and radius_km must be numbers")
+            if not (-90 <= self.latitude <= 90 and -180 <= self.longitude <= 180):
+                raise ValueError("latitude or longitude out of range")
+            if not 0 < self.radius_km <= 100:
+                raise ValueError("radius_km must be between 0 and 100")
+
+    def cells(self) -> List[Tuple[int, int]]:
+        """Geo cells overlapped by the subscription's bounding box"""
+        lat_span = self.radius_km / 111.0
+        lon_span = self.radius_km / (111.0 * max(math.cos(math.radians(self.latitude)), 0.01))
+        low = _cell(self.latitude - lat_span, self.longitude - lon_span)
+        high = _cell(self.latitude + lat_span, self.longitude + lon_span)
+        return [(x, y) for x in range(low[0], high[0] + 1) for y in range(low[1], high[1] + 1)]
+
+
+class AlertSink(ABC):
+    """Destination for triggered alerts"""
+
+    @abstractmethod
+    def emit(self, alerts: List[Dict]):
+        """Deliver a batch of triggered alerts"""
+
+
+class LoggingAlertSink(AlertSink):
+    def emit(self, alerts: List[Dict]):
+        for alert in alerts:
+            logger.info(f"Price alert {alert['subscription_id']}: {alert['site_name']} "
+                        f"{alert['fuel_type']} ${alert['price']:.3f} < ${alert['threshold']:.3f}")
+
+
+class FileAlertSink(AlertSink):
+    """Append alerts to a JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def emit(self, alerts: List[Dict]):
+        with self.lock, open(self.path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, default=str) + '\n')
+
+
+class QueueAlertSink(AlertSink):
+    """Put alerts on an in-process queue (for tests and workers)"""
+
+    def __init__(self, alert_queue: queue.Queue = None):
+        self.queue = alert_queue or queue.Queue()
+
+    def emit(self, alerts: List[Dict]):
+        for alert in alerts:
+            self.queue.put(alert)
+
+
+class _ThresholdBucket:
+    """Subscriptions sorted by threshold"""
+    __slots__ = ('thresholds', 'ids')
+
+    def __init__(self):
+        self.thresholds: List[float] = []
+        self.ids: List[int] = []
+
+    def add(self, threshold: float, subscription_id: int):
+        position = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.ids.insert(position, subscription_id)
+
+    def remove(self, threshold: float, subscription_id: int):
+        position = bisect.bisect_left(self.thresholds, threshold)
+        while position < len(self.ids) and self.ids[position] != subscription_id:
+            position += 1
+        if position < len(self.ids):
+            del self.thresholds[position]
+            del self.ids[position]
+
+    def above(self, price: float) -> List[int]:
+        """Subscriptions whose threshold is strictly above ``price``"""
+        return self.ids[bisect.bisect_right(self.thresholds, price):]
+
+
+class AlertEngine:
+    """
+    Stores subscriptions and evaluates price changes against them
+
+    An alert fires when a station's price drops below a subscription's
+    threshold, and re-arms once that station's price is back at or above it.
+    Fired state is kept per feed, so replayed history and live prices cannot
+    suppress or re-fire each other's alerts.
+    """
+
+    def __init__(self, sink: AlertSink = None, history: int = 500):
+        self.sink = sink or LoggingAlertSink()
+        self.lock = threading.Lock()
+        self.subscriptions: Dict[int, AlertSubscription] = {}
+        self.suburb_buckets: Dict[Tuple[str, str], _ThresholdBucket] = defaultdict(_ThresholdBucket)
+        self.cell_buckets: Dict[Tuple[str, Tuple[int, int]], _ThresholdBucket] = defaultdict(_ThresholdBucket)
+        # feed -> (site_id, fuel_type) -> subscriptions currently fired for that station
+        self.active: Dict[str, Dict[Tuple, set]] = defaultdict(lambda: defaultdict(set))
+        self.recent = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self.stats = {'changes_evaluated': 0, 'candidates_checked': 0, 'alerts_emitted': 0}
+
+    def subscribe(self, subscription: AlertSubscription) -> AlertSubscription:
+        subscription.validate()
+        # Work out every bucket before touching shared state, so bad input leaves nothing behind
+        buckets = self._bucket_keys(subscription)
+        with self.lock:
+            subscription.subscription_id = next(self._ids)
+            for buckets_by_key, key in buckets:
+                buckets_by_key[key].add(subscription.threshold, subscription.subscription_id)
+            self.subscriptions[subscription.subscription_id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription_id: int) -> bool:
+        with self.lock:
+            subscription = self.subscriptions.pop(subscription_id, None)
+            if subscription is None:
+                return False
+            for bucket in self._buckets(subscription):
+                bucket.remove(subscription.threshold, subscription_id)
+            for stations in self.active.values():
+                for fired in stations.values():
+                    fired.discard(subscription_id)
+        return True
+
+    def _bucket_keys(self, subscription: AlertSubscription) -> List[Tuple[Dict, Tuple]]:
+        """(bucket mapping, key) pairs the subscription is indexed under"""
+        if subscription.suburb is not None:
+            return [(self.suburb_buckets, (subscription.fuel_type, subscription.suburb))]
+        return [(self.cell_buckets, (subscription.fuel_type, cell)) for cell in subscription.cells()]
+
+    def _buckets(self, subscription: AlertSubscription) -> List[_ThresholdBucket]:
+        return [buckets_by_key[key] for buckets_by_key, key in self._bucket_keys(subscription)]
+
+    def evaluate(self, changes: Iterable[Dict], feed: str = FEED_LIVE) -> List[Dict]:
+        """
+        Evaluate a batch of price changes and emit triggered alerts
+
+        Args:
+            changes: Dicts with site_id, fuel_type, price and optionally
+                suburb, latitude, longitude, site_name, last_updated
+            feed: Which feed's fired state to check and update
+
+        Returns:
+            The alerts emitted for this batch
+        """
+        alerts = []
+        with self.lock:
+            active = self.active[feed]
+            for change in changes:
+                self.stats['changes_evaluated'] += 1
+                alerts.extend(self._evaluate_change(change, active))
+            self.stats['alerts_emitted'] += len(alerts)
+            self.recent.extend(alerts)
+
+        if alerts:
+            try:
+                self.sink.emit(alerts)
+            except Exception as e:
+                logger.error(f"Alert sink failed: {e}")
+        return alerts
+
+    def seed(self, changes: Iterable[Dict], feed: str = FEED_LIVE):
+        """
+        Mark alerts the current prices already satisfy as fired, without emitting
+
+        Used for a feed's first batch (a whole board rather than changes), so
+        that stations already below a threshold do not all alert at once.
+        """
+        with self.lock:
+            active = self.active[feed]
+            for change in changes:
+                self._evaluate_change(change, active)
+
+    def _evaluate_change(self, change: Dict, active: Dict[Tuple, set]) -> List[Dict]:
+        fuel_type, price = change.get('fuel_type'), change.get('price')
+        if not isinstance(fuel_type, str) or not _finite(price):
+            return []
+        station = (change.get('site_id'), fuel_type)
+
+        # Re-arm subscriptions this station no longer satisfies
+        fired = active.get(station)
+        if fired:
+            for subscription_id in [s for s in fired if price >= self.subscriptions[s].threshold]:
+                fired.discard(subscription_id)
+
+        candidates = []
+        suburb = change.get('suburb')
+        if not isinstance(suburb, str):
+            suburb = None
+        if suburb is not None:
+            bucket = self.suburb_buckets.get((fuel_type, suburb))
+            if bucket is not None:
+                candidates.extend(bucket.above(price))
+
+        # Historical rows can lack coordinates; they can still match suburb subscriptions
+        latitude, longitude = change.get('latitude'), change.get('longitude')
+        if _finite(latitude) and _finite(longitude) and self.cell_buckets:
+            bucket = self.cell_buckets.get((fuel_type, _cell(latitude, longitude)))
+            if bucket is not None:
+                for subscription_id in bucket.above(price):
+                    subscription = self.subscriptions[subscription_id]
+                    if _distance_km(latitude, longitude, subscription.latitude,
+                                    subscription.longitude) <= subscription.radius_km:
+                        candidates.append(subscription_id)
+
+        self.stats['candidates_checked'] += len(candidates)
+        alerts = []
+        for subscription_id in candidates:
+            if subscription_id in active[station]:
+                continue
+            active[station].add(subscription_id)
+            subscription = self.subscriptions[subscription_id]
+            alerts.append({
+                'subscription_id': subscription_id,
+                'subscriber': subscription.subscriber,
+                'fuel_type': fuel_type,
+                'threshold': subscription.threshold,
+                'price': price,
+                'site_id': change.get('site_id'),
+                'site_name': change.get('site_name'),
+                'suburb': suburb,
+                'last_updated': change.get('last_updated'),
+                'triggered': datetime.now().isoformat()
+            })
+        return alerts
+
+    def list_subscriptions(self) -> List[Dict]:
+        with self.lock:
+            return [asdict(subscription) for subscription in self.subscriptions.values()]
+
+    def get_recent(self, limit: int = 50) -> List[Dict]:
+        with self.lock:
+            return list(self.recent)[-limit:][::-1]
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {
+                'subscriptions': len(self.subscriptions),
+                'suburb_buckets': len(self.suburb_buckets),
+                'geo_buckets': len(self.cell_buckets),
+                'active_alerts': sum(len(fired) for stations in self.active.values() for fired in stations.values()),
+                **self.stats
+            }
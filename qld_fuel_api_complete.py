@@ -9,88 +9,155 @@ import os
 from typing import Dict, List, Optional, Union
 import logging
 
+from qld_fuel_upstream import UpstreamGuard, RateLimitExceeded, PRIORITY_INTERACTIVE
+from qld_fuel_health import HealthProber
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class QLDFuelPriceAPI:
-    def __init__(self, api_token: str = "b03319f8-7727-493b-9015-b20a7acae110"):
+    def __init__(self, api_token: str = "b03319f8-7727-493b-9015-b20a7acae110", base_url: str = None,
+                 historical_data_url: str = None):
         self.api_token = api_token
-        self.base_url = "https://fppdirectapi-prod.fuelpricesqld.com.au"
+        self.base_url = base_url or "https://fppdirectapi-prod.fuelpricesqld.com.au"
+        # Optional mirror serving fuel-prices-YYYY-MM-changes-only.csv (e.g. the fake upstream)
+        self.historical_data_url = historical_data_url
+        # Open-data resource URLs by year and month; each month has its own resource id
+        self.historical_datasets = {
+            2025: {
+                1: "https://www.data.qld.gov.au/ckan-opendata-attachments-prod/resources/3d3676f9-9ead-46cb-878b-e5c26f4b14d2/fuel-prices-2025-01-changes-only.csv?ETag=80372741f8adf7621a9a6cc916f30b06"
+            }
+        }
         self.headers = {
             'Authorization': f'FPDAPI SubscriberToken={api_token}',
             'Content-Type': 'application/json',
             'User-Agent': 'QLD-Fuel-Dashboard/1.0'
         }
         self.cache_duration = 300
+        self.price_cache_duration = 60
+        self.request_timeout = 30
         self.last_cache_time = {}
+        # Shared by every upstream call: TTL cache, in-flight coalescing, token bucket
+        self.upstream = UpstreamGuard(rate=2.0, capacity=10.0)
+        # Background /Version prober; call health.start() to keep get_api_status() current
+        self.health = HealthProber(self.probe_version)
+    
+    def _make_request(self, endpoint: str, params: Dict = None, ttl: float = 0,
+                      priority: str = PRIORITY_INTERACTIVE) -> Dict:
+        """Rate-limited, coalesced and optionally cached GET returning parsed JSON"""
+        url = f"{self.base_url}{endpoint}"
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        
+        def fetch():
+            logger.info(f"Making request to: {url}")
+            response = requests.get(url, headers=self.headers, params=params, timeout=self.request_timeout)
+            response.raise_for_status()
+            return response.json()
         
-    def get_api_version(self) -> str:
         try:
-            response = requests.get(f"{self.base_url}/Version", headers=self.headers)
+            return self.upstream.fetch(key, fetch, ttl=ttl, priority=priority)
+        except RateLimitExceeded as e:
+            logger.warning(f"{e}: {endpoint}")
+            return {"error": str(e)}
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {e}")
+            return {"error": str(e)}
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}")
+            return {"error": f"Invalid JSON response: {e}"}
+    
+    def _is_cached(self, cache_key: str) -> bool:
+        cached_at = self.last_cache_time.get(cache_key)
+        return cached_at is not None and time.time() - cached_at < self.cache_duration
+    
+    def _update_cache(self, cache_key: str):
+        self.last_cache_time[cache_key] = time.time()
+        
+    def get_api_version(self, priority: str = PRIORITY_INTERACTIVE) -> str:
+        def fetch():
+            response = requests.get(f"{self.base_url}/Version", headers=self.headers, timeout=10)
             return response.text.strip('"') if response.status_code == 200 else "Unknown"
+        
+        try:
+            return self.upstream.fetch(('/Version', ()), fetch, ttl=self.cache_duration, priority=priority,
+                                       cacheable=lambda version: version != "Unknown")
         except Exception as e:
             logger.error(f"Failed to get API version: {e}")
             return "Unknown"
         
-    def get_fuel_types(self, country_id: int = 21) -> Dict:
+    def probe_version(self, timeout: float) -> str:
+        """Health probe: GET /Version directly, raising on any failure"""
+        # Bypasses the rate limiter so that a saturated bucket is not mistaken for an outage
+        response = requests.get(f"{self.base_url}/Version", headers=self.headers, timeout=timeout)
+        response.raise_for_status()
+        return response.text.strip('"')
+        
+    def get_fuel_types(self, country_id: int = 21, priority: str = PRIORITY_INTERACTIVE) -> Dict:
         """Get available fuel types (21 = Australia in this API)"""
         cache_key = f"fuel_types_{country_id}"
         if self._is_cached(cache_key):
             return self.fuel_types
-        data = self._make_request("/Subscriber/GetCountryFuelTypes", {"countryId": country_id})
+        data = self._make_request("/Subscriber/GetCountryFuelTypes", {"countryId": country_id},
+                                  priority=priority)
         if "error" not in data:
             self.fuel_types = data
             self._update_cache(cache_key)
         return data
     
-    def get_geographic_regions(self, country_id: int = 21) -> Dict:
+    def get_geographic_regions(self, country_id: int = 21, priority: str = PRIORITY_INTERACTIVE) -> Dict:
         """Get geographic regions (21 = Australia in this API)"""
         cache_key = f"regions_{country_id}"
         if self._is_cached(cache_key):
             return self.regions
-        data = self._make_request("/Subscriber/GetCountryGeographicRegions", {"countryId": country_id})
+        data = self._make_request("/Subscriber/GetCountryGeographicRegions", {"countryId": country_id},
+                                  priority=priority)
         if "error" not in data:
             self.regions = data
             self._update_cache(cache_key)
         return data
     
-    def get_brands(self, country_id: int = 21) -> Dict:
+    def get_brands(self, country_id: int = 21, priority: str = PRIORITY_INTERACTIVE) -> Dict:
         """Get fuel brands (21 = Australia in this API)"""
         cache_key = f"brands_{country_id}"
         if self._is_cached(cache_key):
             return self.brands
-        data = self._make_request("/Subscriber/GetCountryBrands", {"countryId": country_id})
+        data = self._make_request("/Subscriber/GetCountryBrands", {"countryId": country_id},
+                                  priority=priority)
         if "error" not in data:
             self.brands = data
             self._update_cache(cache_key)
         return data
     
-    def get_site_details(self, country_id: int = 21, geo_region_level: int = 3, geo_region_id: int = 1) -> Dict:
+    def get_site_details(self, country_id: int = 21, geo_region_level: int = 3, geo_region_id: int = 1,
+                         priority: str = PRIORITY_INTERACTIVE) -> Dict:
         """Get detailed site information using correct parameters"""
         params = {"countryId": country_id, "geoRegionLevel": geo_region_level, "geoRegionId": geo_region_id}
-        data = self._make_request("/Subscriber/GetFullSiteDetails", params)
+        data = self._make_request("/Subscriber/GetFullSiteDetails", params, ttl=self.cache_duration,
+                                  priority=priority)
         if "error" not in data:
             self.sites = data
         return data
     
-    def get_site_prices(self, country_id: int = 21, geo_region_level: int = 3, geo_region_id: int = 1) -> Dict:
+    def get_site_prices(self, country_id: int = 21, geo_region_level: int = 3, geo_region_id: int = 1,
+                        priority: str = PRIORITY_INTERACTIVE) -> Dict:
         """Get current fuel prices using correct parameters"""
         params = {"countryId": country_id, "geoRegionLevel": geo_region_level, "geoRegionId": geo_region_id}
-        data = self._make_request("/Price/GetSitesPrices", params)
+        data = self._make_request("/Price/GetSitesPrices", params, ttl=self.price_cache_duration,
+                                  priority=priority)
         if "error" not in data:
             self.prices = data
         return data
     
+    def get_historical_data_url(self, year: int, month: int) -> Optional[str]:
+        """URL of a monthly changes-only CSV, from the mirror or the known open-data resources"""
+        if self.historical_data_url:
+            return f"{self.historical_data_url}/fuel-prices-{year}-{month:02d}-changes-only.csv"
+        return self.historical_datasets.get(year, {}).get(month)
+    
     def download_historical_data(self, year: int = 2025, month: int = 1) -> pd.DataFrame:
-        datasets = {
-            2025: {
-                1: "https://www.data.qld.gov.au/ckan-opendata-attachments-prod/resources/3d3676f9-9ead-46cb-878b-e5c26f4b14d2/fuel-prices-2025-01-changes-only.csv?ETag=80372741f8adf7621a9a6cc916f30b06"
-            }
-        }
-        
         try:
-            if year in datasets and month in datasets[year]:
-                url = datasets[year][month]
+            url = self.get_historical_data_url(year, month)
+            if url:
                 logger.info(f"Downloading historical data from: {url}")
                 
                 response = requests.get(url, allow_redirects=True, timeout=60)
@@ -218,9 +285,12 @@ class QLDFuelPriceAPI:
             return []
     
     def get_api_status(self) -> Dict:
+        """Cached upstream health from the background prober; never blocks on the network"""
+        health = self.health.get_status()
         status = {
             'timestamp': datetime.now().isoformat(),
-            'api_version': self.get_api_version(),
+            'api_version': health['api_version'] or 'Unknown',
+            'connectivity': health.pop('connectivity'),
             'endpoints': {
                 'base_url': self.base_url,
                 'available_endpoints': [
@@ -228,15 +298,10 @@ class QLDFuelPriceAPI:
                     '/Subscriber/GetCountryGeographicRegions', '/Subscriber/GetCountryBrands',
                     '/Subscriber/GetFullSiteDetails'
                 ]
-            }
+            },
+            'health': health,
+            'upstream': self.upstream.get_status()
         }
-        
-        try:
-            response = requests.get(f"{self.base_url}/Version", headers=self.headers, timeout=10)
-            status['connectivity'] = 'OK' if response.status_code == 200 else 'ERROR'
-        except Exception as e:
-            status['connectivity'] = f'ERROR: {e}'
-        
         return status
 
 def main():
@@ -245,6 +310,7 @@ def main():
     print("=== Queensland Fuel Price API Client ===")
     print(f"API Version: {api.get_api_version()}")
     
+    api.health.check()
     status = api.get_api_status()
     print(f"Connection Status: {status['connectivity']}")
     
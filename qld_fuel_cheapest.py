@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Shared cheapest-station index.
+
+Built once per data generation from PriceHistoryIndex: the latest price of
+every (site, fuel) series is sorted by (fuel, price) and by (fuel, suburb,
+price), so any cheapest-N lookup is a slice of a precomputed order. Many
+lookups can be answered together with a single row materialization, and
+rank/percentile questions are binary searches within the same sorted runs.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from qld_fuel_price_history import PriceHistoryIndex
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['site_id', 'site_name', 'brand', 'address', 'suburb', 'postcode', 'price',
+                  'last_updated', 'latitude', 'longitude']
+
+
+class CheapestStationIndex:
+    """Latest price per (site, fuel), pre-sorted for cheapest-N, rank and percentile queries"""
+
+    def __init__(self, history: PriceHistoryIndex):
+        self.series_count = history.series_count
+        if history.series_count == 0:
+            self.board = pd.DataFrame(columns=RESULT_COLUMNS)
+            self._fuel_ranges = {}
+            self._suburb_ranges = {}
+            self._series_rows = {}
+            return
+
+        ends = np.append(history.series_start[1:], len(history.prices)) - 1
+        prices = history.prices[ends]
+        fuel_codes = history.series_fuel
+        suburb_codes = history.series_suburb
+
+        board = history.series_meta.rename(columns={'site_brand': 'brand'})
+        board.insert(0, 'site_id', history.series_site)
+        board['price'] = prices
+        board['last_updated'] = pd.to_datetime(history.seconds[ends], unit='s').strftime('%Y-%m-%d %H:%M:%S')
+        self.board = board[RESULT_COLUMNS]
+
+        # Order by (fuel, price) and by (fuel, suburb, price); each group is a contiguous range
+        self.fuel_order = np.lexsort((prices, fuel_codes))
+        self.suburb_order = np.lexsort((prices, suburb_codes, fuel_codes))
+        self._fuel_ranges = self._ranges(fuel_codes[self.fuel_order], history.fuel_types)
+        # Suburb code -1 (missing suburb) shifts to slot 0 of each fuel's block
+        stride = len(history.suburbs) + 1
+        suburb_labels = [None] + list(history.suburbs)
+        self._suburb_ranges = self._ranges(
+            fuel_codes[self.suburb_order] * stride + suburb_codes[self.suburb_order] + 1,
+            [(fuel, suburb) for fuel in history.fuel_types for suburb in suburb_labels]
+        )
+        self.fuel_sorted_prices = prices[self.fuel_order]
+        self.suburb_sorted_prices = prices[self.suburb_order]
+        self._series_rows = {(site, fuel): row for row, (site, fuel) in
+                             enumerate(zip(history.series_site.tolist(), history.fuel_types[fuel_codes]))}
+
+    @staticmethod
+    def _ranges(sorted_codes: np.ndarray, labels) -> Dict:
+        """Map each label to the (start, stop) of its run in a sorted code array"""
+        codes, starts, counts = np.unique(sorted_codes, return_index=True, return_counts=True)
+        return {labels[code]: (start, start + count) for code, start, count in zip(codes, starts, counts)}
+
+    def _rows(self, fuel_type: str, suburb: Optional[str], limit: int) -> np.ndarray:
+        limit = max(limit, 0)
+        if suburb:
+            start, stop = self._suburb_ranges.get((fuel_type, suburb), (0, 0))
+            return self.suburb_order[start:min(stop, start + limit)]
+        start, stop = self._fuel_ranges.get(fuel_type, (0, 0))
+        return self.fuel_order[start:min(stop, start + limit)]
+
+    def find_cheapest(self, fuel_type: str, suburb: str = None, limit: int = 10) -> List[Dict]:
+        """Cheapest stations by latest price, same shape as find_cheapest_stations"""
+        return self.find_cheapest_batch([(fuel_type, suburb, limit)])[0]
+
+    def find_cheapest_batch(self, queries: List[Tuple[str, Optional[str], int]]) -> List[List[Dict]]:
+        """
+        Answer many (fuel_type, suburb, limit) lookups in one pass
+
+        Returns:
+            One station list per query, in query order
+        """
+        if self.series_count == 0:
+            return [[] for _ in queries]
+
+        selections = [self._rows(fuel_type, suburb, limit) for fuel_type, suburb, limit in queries]
+        rows = np.concatenate(selections) if selections else np.array([], dtype=np.int64)
+
+        # Materialize every result row at once, then split back per query
+        records = self.board.iloc[rows]
+        records = records.astype(object).where(records.notna(), None).to_dict('records')
+        results, offset = [], 0
+        for selection in selections:
+            results.append(records[offset:offset + len(selection)])
+            offset += len(selection)
+        return results
+
+    def _scope(self, fuel_type: str, suburb: Optional[str]) -> np.ndarray:
+        """Sorted latest prices for a fuel, statewide or within one suburb"""
+        if suburb:
+            start, stop = self._suburb_ranges.get((fuel_type, suburb), (0, 0))
+            return self.suburb_sorted_prices[start:stop]
+        start, stop = self._fuel_ranges.get(fuel_type, (0, 0))
+        return self.fuel_sorted_prices[start:stop]
+
+    def rank(self, site_id: int, fuel_type: str, within_suburb: bool = False) -> Optional[Dict]:
+        """
+        Rank of a station's latest price among its peers (1 = cheapest)
+
+        Args:
+            site_id: Station to look up
+            fuel_type: Fuel type to compare
+            within_suburb: Compare against the station's suburb instead of the state
+
+        Returns:
+            Rank details, or None if the station does not sell that fuel.
+            A station with no suburb is ranked statewide.
+        """
+        row = self._series_rows.get((site_id, fuel_type))
+        if row is None:
+            return None
+        station = self.board.iloc[row]
+        suburb = station['suburb'] if pd.notna(station['suburb']) else None
+        within_suburb = within_suburb and suburb is not None
+        prices = self._scope(fuel_type, suburb if within_suburb else None)
+        total = len(prices)
+        if total == 0:
+            return None
+
+        price = station['price']
+        cheaper = int(np.searchsorted(prices, price, side='left'))
+        not_dearer = int(np.searchsorted(prices, price, side='right'))
+        return {
+            'site_id': site_id,
+            'site_name': station['site_name'],
+            'suburb': suburb,
+            'fuel_type': fuel_type,
+            'scope': 'suburb' if within_suburb else 'state',
+            'price': float(price),
+            'rank': cheaper + 1,
+            'tied': not_dearer - cheaper,
+            'stations': total,
+            # Share of stations priced at or below this one
+            'percentile': round(100 * not_dearer / total, 2),
+            'cheaper_than_pct': round(100 * (total - not_dearer) / total, 2)
+        }
+
+    def price_at_percentile(self, fuel_type: str, percentile: float, suburb: str = None) -> Optional[Dict]:
+        """Latest price at a given percentile (nearest-rank), statewide or per suburb"""
+        prices = self._scope(fuel_type, suburb)
+        if len(prices) == 0:
+            return None
+        percentile = min(max(percentile, 0.0), 100.0)
+        index = max(math.ceil(percentile / 100 * len(prices)) - 1, 0)
+        return {
+            'fuel_type': fuel_type,
+            'suburb': suburb,
+            'percentile': percentile,
+            'price': float(prices[index]),
+            'stations': len(prices)
+        }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Partitioned Parquet dataset of historical fuel prices, and the backfill CLI that builds it.
+
+Layout (Hive-style, so readers can prune by directory):
+
+    <root>/year=2025/month=01/fuel_type=Diesel/part-0.parquet
+    <root>/year=2025/month=01/_SUCCESS
+
+Each month is downloaded and cleaned with QLDFuelPriceAPI in a worker process,
+written to a temporary directory and renamed into place with a _SUCCESS marker,
+so an interrupted backfill resumes by skipping completed months.
+
+Usage:
+    python3 qld_fuel_dataset.py --root data/fuel --start 2023-01 --end 2025-06 --workers 8
+    python3 qld_fuel_dataset.py --root data/fuel --start 2025-01 --end 2025-03 \\
+        --manifest months.json            # {"2025-02": "https://...csv", ...}
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    ds = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUCCESS_MARKER = '_SUCCESS'
+
+# Derived from transaction_date on read; not stored
+DROPPED_COLUMNS = ['date']
+
+
+def month_range(start: str, end: str) -> List[Tuple[int, int]]:
+    """Inclusive list of (year, month) between two YYYY-MM strings"""
+    periods = pd.period_range(pd.Period(start, 'M'), pd.Period(end, 'M'), freq='M')
+    return [(period.year, period.month) for period in periods]
+
+
+def _month_dir(root: str, year: int, month: int) -> str:
+    return os.path.join(root, f"year={year}", f"month={month:02d}")
+
+
+def _require_pyarrow():
+    if ds is None:
+        raise ImportError("pyarrow is required for the partitioned dataset (pip install pyarrow)")
+
+
+class FuelPriceDataset:
+    """Reader for the partitioned dataset with partition pruning"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def is_complete(self, year: int, month: int) -> bool:
+        return os.path.exists(os.path.join(_month_dir(self.root, year, month), SUCCESS_MARKER))
+
+    def completed_months(self) -> List[Tuple[int, int]]:
+        months = []
+        if not os.path.isdir(self.root):
+            return months
+        for year_dir in os.listdir(self.root):
+            if not year_dir.startswith('year='):
+                continue
+            for month_dir in os.listdir(os.path.join(self.root, year_dir)):
+                if month_dir.startswith('month=') and '.tmp' not in month_dir:
+                    year, month = int(year_dir[5:]), int(month_dir[6:])
+                    if self.is_complete(year, month):
+                        months.append((year, month))
+        return sorted(months)
+
+    def read_month(self, year: int, month: int, fuel_types: Iterable[str] = None) -> pd.DataFrame:
+        return self.read([(year, month)], fuel_types)
+
+    def read(self, months: Iterable[Tuple[int, int]] = None, fuel_types: Iterable[str] = None) -> pd.DataFrame:
+        """
+        Load completed months, reading only the matching partitions
+
+        Args:
+            months: (year, month) pairs to load (default: every completed month)
+            fuel_types: Optional fuel types to load
+
+        Returns:
+            Frame in the same shape as QLDFuelPriceAPI._clean_historical_data
+        """
+        _require_pyarrow()
+        completed = set(self.completed_months())
+        months = sorted(completed if months is None else set(months) & completed)
+        if not months:
+            return pd.DataFrame()
+
+        fuel_filter = None
+        if fuel_types:
+            fuel_filter = ds.field('fuel_type').isin(list(fuel_types))
+
+        tables = []
+        for year, month in months:
+            # Opening each month directory prunes by year/month before any file is touched
+            month_dataset = ds.dataset(_month_dir(self.root, year, month), format='parquet',
+                                       partitioning=ds.partitioning(pa.schema([('fuel_type', pa.string())]),
+                                                                    flavor='hive'))
+            tables.append(month_dataset.to_table(filter=fuel_filter))
+
+        df = pa.concat_tables(tables, promote_options='default').to_pandas()
+        if 'transaction_date' in df.columns:
+            df['date'] = df['transaction_date'].dt.date
+            df = df.sort_values('transaction_date', ascending=False)
+        return df.reset_index(drop=True)
+
+
+def write_month(root: str, year: int, month: int, df: pd.DataFrame) -> int:
+    """Atomically write one cleaned month, partitioned by fuel type"""
+    _require_pyarrow()
+    final_dir = _month_dir(root, year, month)
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    table = pa.Table.from_pandas(df.drop(columns=DROPPED_COLUMNS, errors='ignore'), preserve_index=False)
+    ds.write_dataset(
+        table, tmp_dir, format='parquet',
+        partitioning=ds.partitioning(pa.schema([('fuel_type', pa.string())]), flavor='hive'),
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    open(os.path.join(tmp_dir, SUCCESS_MARKER), 'w').close()
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    return table.num_rows
+
+
+def _backfill_month(root: str, year: int, month: int, manifest: Dict[str, str],
+                    historical_data_url: Optional[str]) -> Dict:
+    """Worker: download, clean and write one month"""
+    from qld_fuel_api_complete import QLDFuelPriceAPI
+
+    started = time.perf_counter()
+    api = QLDFuelPriceAPI(historical_data_url=historical_data_url)
+    url = manifest.get(f"{year}-{month:02d}")
+    if url:
+        api.historical_datasets.setdefault(year, {})[month] = url
+    if not api.get_historical_data_url(year, month):
+        return {'month': f"{year}-{month:02d}", 'status': 'missing'}
+
+    df = api.download_historical_data(year, month)
+    if df.empty:
+        return {'month': f"{year}-{month:02d}", 'status': 'failed'}
+
+    rows = write_month(root, year, month, df)
+    return {'month': f"{year}-{month:02d}", 'status': 'written', 'rows': rows,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+def backfill(root: str, months: List[Tuple[int, int]], workers: int = None, manifest: Dict[str, str] = None,
+             historical_data_url: str = None, force: bool = False) -> List[Dict]:
+    """
+    Download and write many months in parallel, skipping completed ones
+
+    Returns:
+        One result per month: written, skipped, missing or failed
+    """
+    _require_pyarrow()
+    os.makedirs(root, exist_ok=True)
+    dataset = FuelPriceDataset(root)
+    manifest = manifest or {}
+
+    results = []
+    pending = []
+    for year, month in months:
+        if not force and dataset.is_complete(year, month):
+            results.append({'month': f"{year}-{month:02d}", 'status': 'skipped'})
+        else:
+            pending.append((year, month))
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_backfill_month, root, year, month, manifest, historical_data_url): (year, month)
+                   for year, month in pending}
+        for future in as_completed(futures):
+            year, month = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'month': f"{year}-{month:02d}", 'status': 'failed', 'error': str(e)}
+            logger.info(f"Backfill {result['month']}: {result['status']}")
+            results.append(result)
+
+    return sorted(results, key=lambda result: result['month'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill monthly fuel price CSVs into a partitioned Parquet dataset')
+    parser.add_argument('--root', required=True, help='Dataset directory')
+    parser.add_argument('--start', required=True, help='First month (YYYY-MM)')
+    parser.add_argument('--end', required=True, help='Last month (YYYY-MM)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--manifest', help='JSON file mapping "YYYY-MM" to CSV URLs')
+    parser.add_argument('--historical-data-url', help='Mirror serving fuel-prices-YYYY-MM-changes-only.csv')
+    parser.add_argument('--force', action='store_true', help='Rewrite months that are already complete')
+    args = parser.parse_args()
+
+    manifest = {}
+    if args.manifest:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+
+    started = time.perf_counter()
+    results = backfill(args.root, month_range(args.start, args.end), args.workers, manifest,
+                       args.historical_data_url, args.force)
+
+    print(f"\n{'month':<8} {'status':<8} {'rows':>10}")
+    for result in results:
+        print(f"{result['month']:<8} {result['status']:<8} {result.get('rows', ''):>10}")
+    written = sum(result.get('rows', 0) for result in results)
+    print(f"\n{written} rows written in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Queensland fuel price upstreams.
+
+Emulates the live API (fppdirectapi-prod.fuelpricesqld.com.au) and the monthly
+changes-only CSV downloads from data.qld.gov.au so the dashboard can be run and
+load-tested offline. Latency, error rate and data volume are configurable, and
+a changes-only CSV can be replayed as a live feed at accelerated speed.
+
+Usage:
+    python3 qld_fuel_fake_upstream.py --sites 1800 --latency-ms 150 --error-rate 0.02
+    python3 qld_fuel_fake_upstream.py --replay fuel-prices-2025-01-changes-only.csv --speed 120
+
+Then start the dashboard against it:
+    QLD_FUEL_API_BASE_URL=http://localhost:5050 \\
+    QLD_FUEL_HISTORICAL_DATA_URL=http://localhost:5050/csv python3 qld_fuel_web_app.py
+"""
+
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from flask import Flask, Response, jsonify, request
+
+from qld_fuel_api_complete import QLDFuelPriceAPI
+from qld_fuel_price_history import PriceHistoryIndex
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FUEL_TYPES = ['Unleaded', 'Diesel', 'e10', 'PULP 95/96 RON', 'PULP 98 RON', 'Premium Diesel', 'LPG']
+BRANDS = ['7 Eleven', 'Ampol', 'BP', 'Caltex', 'Coles Express', 'Freedom Fuels', 'Liberty',
+          'Metro Fuel', 'Puma Energy', 'Shell', 'United', 'Vibe']
+
+# (suburb, postcode, latitude, longitude, level-2 region)
+SUBURBS = [
+    ('Brisbane City', 4000, -27.468, 153.023, 'Brisbane'), ('Fortitude Valley', 4006, -27.457, 153.034, 'Brisbane'),
+    ('Woolloongabba', 4102, -27.488, 153.036, 'Brisbane'), ('Indooroopilly', 4068, -27.500, 152.973, 'Brisbane'),
+    ('Chermside', 4032, -27.385, 153.030, 'Brisbane'), ('Carindale', 4152, -27.503, 153.101, 'Brisbane'),
+    ('Logan Central', 4114, -27.639, 153.109, 'Logan'), ('Springwood', 4127, -27.613, 153.128, 'Logan'),
+    ('Ipswich', 4305, -27.614, 152.758, 'Ipswich'), ('Springfield', 4300, -27.653, 152.917, 'Ipswich'),
+    ('Southport', 4215, -27.967, 153.400, 'Gold Coast'), ('Surfers Paradise', 4217, -28.002, 153.430, 'Gold Coast'),
+    ('Robina', 4226, -28.078, 153.385, 'Gold Coast'), ('Coolangatta', 4225, -28.168, 153.536, 'Gold Coast'),
+    ('Maroochydore', 4558, -26.660, 153.100, 'Sunshine Coast'), ('Caloundra', 4551, -26.803, 153.121, 'Sunshine Coast'),
+    ('Toowoomba City', 4350, -27.561, 151.953, 'Toowoomba'), ('Townsville City', 4810, -19.259, 146.817, 'Townsville'),
+    ('Cairns City', 4870, -16.920, 145.771, 'Cairns'), ('Mackay', 4740, -21.144, 149.186, 'Mackay'),
+    ('Rockhampton City', 4700, -23.378, 150.510, 'Rockhampton'), ('Bundaberg Central', 4670, -24.866, 152.349, 'Bundaberg'),
+    ('Hervey Bay', 4655, -25.290, 152.840, 'Fraser Coast'), ('Gladstone Central', 4680, -23.843, 151.256, 'Gladstone'),
+]
+
+CSV_COLUMNS = {
+    'site_id': 'SiteId', 'site_name': 'Site_Name', 'site_brand': 'Site_Brand', 'address': 'Sites_Address_Line_1',
+    'suburb': 'Site_Suburb', 'state': 'Site_State', 'postcode': 'Site_Post_Code', 'latitude': 'Site_Latitude',
+    'longitude': 'Site_Longitude', 'fuel_type': 'Fuel_Type', 'price': 'Price', 'transaction_date': 'TransactionDateutc'
+}
+
+STATE_REGION_ID = 1
+
+
+@dataclass
+class FakeUpstreamConfig:
+    """Knobs for the fake upstream"""
+    sites: int = 1800
+    days: int = 31
+    changes_per_day: float = 1.5
+    start: str = '2025-01-01'
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    replay: Optional[str] = None
+    speed: float = 60.0
+    seed: int = 42
+
+
+def generate_changes(config: FakeUpstreamConfig) -> pd.DataFrame:
+    """Generate a cleaned changes-only frame with restoration/undercut cycles"""
+    rng = np.random.default_rng(config.seed)
+    site_index = np.arange(config.sites)
+    suburb_index = rng.integers(0, len(SUBURBS), config.sites)
+    suburbs = [SUBURBS[i] for i in suburb_index]
+    sites = pd.DataFrame({
+        'site_id': 61290000 + site_index,
+        'site_brand': np.array(BRANDS)[rng.integers(0, len(BRANDS), config.sites)],
+        'address': [f"{rng.integers(1, 999)} Main Road" for _ in site_index],
+        'suburb': [s[0] for s in suburbs],
+        'state': 'QLD',
+        'postcode': [s[1] for s in suburbs],
+        'latitude': [s[2] + rng.normal(0, 0.01) for s in suburbs],
+        'longitude': [s[3] + rng.normal(0, 0.01) for s in suburbs],
+    })
+    sites['site_name'] = sites['site_brand'] + ' ' + sites['suburb']
+
+    # Each site sells a random subset of fuels
+    offered = rng.random((config.sites, len(FUEL_TYPES))) < np.array([1.0, 0.9, 0.6, 0.8, 0.7, 0.3, 0.15])
+    site_rows, fuel_rows = np.nonzero(offered)
+    span = config.days * 86400
+    per_series = max(1, int(config.days * config.changes_per_day))
+
+    series = np.repeat(np.arange(len(site_rows)), per_series)
+    offsets = np.sort(rng.integers(0, span, (len(site_rows), per_series)), axis=1).ravel()
+    steps = np.where(rng.random(len(series)) < 0.12, rng.integers(150, 300, len(series)),
+                     -rng.integers(5, 30, len(series)))
+    base = 1750 + 150 * fuel_rows + rng.integers(-40, 40, len(site_rows))
+    cumulative = pd.Series(steps).groupby(series).cumsum().to_numpy()
+    # Keep each series inside a plausible band
+    prices = base[series] + np.mod(cumulative, 400) - 200
+
+    changes = sites.iloc[site_rows[series]].reset_index(drop=True)
+    changes['fuel_type'] = np.array(FUEL_TYPES)[fuel_rows[series]]
+    changes['price'] = prices
+    changes['price_dollars'] = prices / 1000
+    changes['transaction_date'] = pd.Timestamp(config.start) + pd.to_timedelta(offsets, unit='s')
+    changes['date'] = changes['transaction_date'].dt.date
+    return changes.sort_values('transaction_date', ascending=False)
+
+
+def load_replay(path: str) -> pd.DataFrame:
+    """Load and clean a changes-only CSV for replay"""
+    return QLDFuelPriceAPI()._clean_historical_data(pd.read_csv(path))
+
+
+def opening_board(changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Changes plus an opening price for every (site, fuel) at the data start
+
+    A changes-only feed has no opening board, so a replay clock starting at
+    the first change would serve only the handful of series that changed in
+    the first minutes. Each series' first recorded price is back-dated to
+    the start so the live feed is complete from the first request.
+    """
+    dated = changes.dropna(subset=['transaction_date'])
+    if dated.empty:
+        return changes
+    opening = dated.sort_values('transaction_date', kind='mergesort').drop_duplicates(['site_id', 'fuel_type'])
+    opening = opening.assign(transaction_date=dated['transaction_date'].min())
+    return pd.concat([opening, changes], ignore_index=True)
+
+
+def create_app(config: FakeUpstreamConfig = None) -> Flask:
+    """Build the fake upstream Flask app"""
+    config = config or FakeUpstreamConfig()
+    changes = load_replay(config.replay) if config.replay else generate_changes(config)
+    history = PriceHistoryIndex(opening_board(changes))
+    wall_start = time.time()
+
+    meta = history.series_meta.copy()
+    meta['site_id'] = history.series_site
+    sites = meta.drop_duplicates('site_id').reset_index(drop=True)
+    fuel_ids = {fuel: i + 2 for i, fuel in enumerate(history.fuel_types)}
+    brand_ids = {brand: i + 1 for i, brand in enumerate(sorted(sites['site_brand'].dropna().unique()))}
+    region_of = {s[0]: s[4] for s in SUBURBS}
+    level2 = {name: i + 1 for i, name in enumerate(sorted(set(region_of.values()) | {'Other'}))}
+    level1 = {name: i + 1 for i, name in enumerate(sorted(sites['suburb'].dropna().unique()))}
+
+    app = Flask(__name__)
+    app.config['FAKE_UPSTREAM'] = config
+    stats = {'requests': 0, 'errors_injected': 0}
+
+    def virtual_now() -> pd.Timestamp:
+        """Replay clock: data start plus accelerated wall time, wrapping at the end"""
+        span = max(history.end_time - history.base_time, 1)
+        elapsed = int((time.time() - wall_start) * config.speed) % span
+        return pd.Timestamp(history.base_time + elapsed, unit='s')
+
+    @app.before_request
+    def inject_latency_and_errors():
+        stats['requests'] += 1
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if request.path != '/_fake/status' and random.random() < config.error_rate:
+            stats['errors_injected'] += 1
+            return jsonify({'Message': 'Injected upstream error'}), 503
+
+    @app.route('/Version')
+    def version():
+        return Response('"1.0.0-fake"', mimetype='application/json')
+
+    @app.route('/Subscriber/GetCountryFuelTypes')
+    def fuel_types():
+        return jsonify({'Fuels': [{'FuelId': i, 'Name': name} for name, i in fuel_ids.items()]})
+
+    @app.route('/Subscriber/GetCountryBrands')
+    def brands():
+        return jsonify({'Brands': [{'BrandId': i, 'Name': name} for name, i in brand_ids.items()]})
+
+    @app.route('/Subscriber/GetCountryGeographicRegions')
+    def regions():
+        rows = [{'GeoRegionLevel': 3, 'GeoRegionId': STATE_REGION_ID, 'Name': 'Queensland',
+                 'Abbrev': 'QLD', 'GeoRegionParentId': None}]
+        rows += [{'GeoRegionLevel': 2, 'GeoRegionId': i, 'Name': name, 'Abbrev': name[:3].upper(),
+                  'GeoRegionParentId': STATE_REGION_ID} for name, i in level2.items()]
+        rows += [{'GeoRegionLevel': 1, 'GeoRegionId': i, 'Name': name, 'Abbrev': name[:3].upper(),
+                  'GeoRegionParentId': level2[region_of.get(name, 'Other')]} for name, i in level1.items()]
+        return jsonify({'GeographicRegions': rows})
+
+    @app.route('/Subscriber/GetFullSiteDetails')
+    def site_details():
+        rows = []
+        for site in sites.itertuples(index=False):
+            rows.append({
+                'S': int(site.site_id), 'A': site.address, 'N': site.site_name,
+                'B': brand_ids.get(site.site_brand), 'P': str(site.postcode),
+                'G1': level1.get(site.suburb), 'G2': level2[region_of.get(site.suburb, 'Other')],
+                'G3': STATE_REGION_ID, 'G4': 0, 'G5': 0,
+                'Lat': float(site.latitude), 'Lng': float(site.longitude),
+                'M': '2025-01-01T00:00:00'
+            })
+        return jsonify({'S': rows})
+
+    @app.route('/Price/GetSitesPrices')
+    def site_prices():
+        board = history.prices_at(virtual_now())
+        return jsonify({'SitePrices': [{
+            'SiteId': int(row['site_id']), 'FuelId': fuel_ids[row['fuel_type']], 'CollectionMethod': 'T',
+            'TransactionDateUtc': row['last_updated'].replace(' ', 'T'), 'Price': round(row['price'] * 1000, 1)
+        } for row in board]})
+
+    @app.route('/csv/fuel-prices-<int:year>-<int:month>-changes-only.csv')
+    def monthly_csv(year, month):
+        month_start = pd.Timestamp(year=year, month=month, day=1)
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        in_month = changes[(changes['transaction_date'] >= month_start) & (changes['transaction_date'] < month_end)]
+        if in_month.empty:
+            return jsonify({'error': 'Not found'}), 404
+        out = in_month[list(CSV_COLUMNS)].rename(columns=CSV_COLUMNS)
+        out['TransactionDateutc'] = out['TransactionDateutc'].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        return Response(out.to_csv(index=False), mimetype='text/csv')
+
+    @app.route('/_fake/status')
+    def fake_status():
+        return jsonify({**stats, 'virtual_time': virtual_now().isoformat(), 'coverage': history.get_coverage(),
+                        'sites': len(sites), 'latency_ms': config.latency_ms, 'error_rate': config.error_rate})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Queensland fuel price upstream')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--sites', type=int, default=1800, help='Number of generated sites')
+    parser.add_argument('--days', type=int, default=31, help='Days of generated changes')
+    parser.add_argument('--changes-per-day', type=float, default=1.5, help='Price changes per site and fuel per day')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--replay', help='Changes-only CSV to replay instead of generated data')
+    parser.add_argument('--speed', type=float, default=60.0, help='Replay speed multiplier')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    config = FakeUpstreamConfig(
+        sites=args.sites, days=args.days, changes_per_day=args.changes_per_day,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        replay=args.replay, speed=args.speed, seed=args.seed
+    )
+    app = create_app(config)
+    logger.info(f"Fake upstream listening on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
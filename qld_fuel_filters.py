@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Bitmap-indexed filtering over the historical frame.
+
+Built once per data generation. Every value of fuel_type, brand, suburb,
+postcode and day has a sorted posting list of row positions; values common
+enough that a packed NumPy bitset is smaller than their posting list also get
+one (the array/bitmap container split used by roaring bitmaps). A query
+starts from its most selective term's posting list and probes the other
+terms (AND across attributes, OR within one) by bit test or binary search,
+so the work follows the number of matching rows rather than the dataset
+size. Price ranges use a price-sorted order when no other term is more
+selective.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from qld_fuel_search import postcode_key
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Filter name -> frame column
+ATTRIBUTES = {
+    'fuel_type': 'fuel_type',
+    'brand': 'site_brand',
+    'suburb': 'suburb',
+    'postcode': 'postcode',
+}
+
+Values = Union[None, str, Iterable]
+
+
+class _Term:
+    """Rows matching one attribute (the OR of its selected values)"""
+    __slots__ = ('postings', 'bitsets', 'size')
+
+    def __init__(self, postings: List[np.ndarray], bitsets: List[Optional[np.ndarray]]):
+        self.postings = postings
+        self.bitsets = bitsets
+        self.size = sum(len(p) for p in postings)
+
+    def rows(self) -> np.ndarray:
+        if not self.postings:
+            return np.empty(0, dtype=np.int64)
+        if len(self.postings) == 1:
+            return self.postings[0]
+        return np.sort(np.concatenate(self.postings))
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        """Membership of each (sorted) row: bit test for dense values, binary search for sparse ones"""
+        hit = np.zeros(len(rows), dtype=bool)
+        for posting, bits in zip(self.postings, self.bitsets):
+            if bits is not None:
+                # Packed big-endian, as np.packbits
+                hit |= ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+            elif len(posting):
+                positions = np.minimum(np.searchsorted(posting, rows), len(posting) - 1)
+                hit |= posting[positions] == rows
+        return hit
+
+
+class FilterIndex:
+    """Posting lists and bitsets per attribute value, plus a price order"""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from a cleaned historical DataFrame
+
+        Args:
+            df: Output of QLDFuelPriceAPI._clean_historical_data; row positions
+                refer to this frame's order
+        """
+        started = time.perf_counter()
+        self.df = df
+        self.row_count = len(df)
+        self.postings: Dict[str, Dict[object, np.ndarray]] = {}
+        # Only values whose bitset is smaller than their posting list
+        self.bitsets: Dict[str, Dict[object, np.ndarray]] = {}
+
+        for name, column in ATTRIBUTES.items():
+            if column in df.columns:
+                self._index(name, df[column], postcode_key if name == 'postcode' else None)
+
+        if 'transaction_date' in df.columns:
+            self.dates = df['transaction_date'].to_numpy(dtype='datetime64[ns]')
+            # Days since the epoch; NaT becomes a sentinel that no range reaches
+            days = self.dates.astype('datetime64[D]').astype(np.int64)
+            self._index('day', pd.Series(np.where(np.isnat(self.dates), np.iinfo(np.int64).min, days)))
+        else:
+            self.dates = None
+
+        self.prices = df['price_dollars'].to_numpy(dtype=float) if 'price_dollars' in df.columns else None
+        if self.prices is not None:
+            # NaN prices sort last and are never inside a range
+            self.price_order = np.argsort(self.prices, kind='stable').astype(np.int64)
+            self.sorted_prices = self.prices[self.price_order]
+
+        self.elapsed = time.perf_counter() - started
+        logger.info(f"Filter index built over {self.row_count} rows in {self.elapsed * 1000:.1f} ms")
+
+    def _index(self, name: str, values: pd.Series, normalize=None):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(len(uniques)), side='left')
+        stops = np.searchsorted(sorted_codes, np.arange(len(uniques)), side='right')
+
+        postings, bitsets = {}, {}
+        for code, value in enumerate(uniques):
+            rows = order[starts[code]:stops[code]].astype(np.int64)
+            key = value.item() if isinstance(value, np.generic) else value
+            if normalize is not None:
+                key = normalize(key)
+            postings[key] = rows
+            if rows.nbytes > self.row_count // 8:
+                mask = np.zeros(self.row_count, dtype=bool)
+                mask[rows] = True
+                bitsets[key] = np.packbits(mask)
+        self.postings[name] = postings
+        self.bitsets[name] = bitsets
+
+    def values(self, name: str) -> List:
+        """Indexed values of one attribute"""
+        return list(self.postings.get(name, {}))
+
+    def _term(self, name: str, values: Values) -> Optional[_Term]:
+        if values is None:
+            return None
+        if isinstance(values, (str, int, np.datetime64)) or not isinstance(values, Iterable):
+            values = [values]
+        if name == 'postcode':
+            values = [postcode_key(value) for value in values]
+        postings = self.postings.get(name, {})
+        keys = [value for value in dict.fromkeys(values) if value in postings]
+        return _Term([postings[key] for key in keys], [self.bitsets[name].get(key) for key in keys])
+
+    def _day_term(self, start, end) -> Optional[_Term]:
+        if (start is None and end is None) or self.dates is None:
+            return None
+        days = self.postings.get('day', {})
+        low = np.datetime64(start, 'D').astype(np.int64) if start is not None else np.iinfo(np.int64).min + 1
+        high = np.datetime64(end, 'D').astype(np.int64) if end is not None else np.iinfo(np.int64).max
+        keys = [day for day in days if low <= day <= high]
+        return _Term([days[key] for key in keys], [self.bitsets['day'].get(key) for key in keys])
+
+    def select(self, fuel_type: Values = None, brand: Values = None, suburb: Values = None,
+               postcode: Values = None, start=None, end=None,
+               min_price: float = None, max_price: float = None) -> np.ndarray:
+        """
+        Row positions matching every given filter, in frame order
+
+        Each attribute accepts one value or several (matched with OR);
+        attributes combine with AND. ``start``/``end`` are inclusive
+        instants in naive UTC, ``min_price``/``max_price`` inclusive dollars.
+        """
+        terms = [self._term(name, values) for name, values in
+                 (('fuel_type', fuel_type), ('brand', brand), ('suburb', suburb), ('postcode', postcode))]
+        terms.append(self._day_term(start, end))
+        terms = sorted((term for term in terms if term is not None), key=lambda term: term.size)
+        price_filter = (min_price is not None or max_price is not None) and self.prices is not None
+
+        # An unknown value or a date range outside the data matches nothing
+        if terms and terms[0].size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        if price_filter:
+            low = np.searchsorted(self.sorted_prices, min_price, side='left') if min_price is not None else 0
+            high = np.searchsorted(self.sorted_prices, max_price, side='right') if max_price is not None \
+                else np.searchsorted(self.sorted_prices, np.inf, side='right')
+            if high <= low:
+                return np.empty(0, dtype=np.int64)
+
+        # Start from the smallest candidate set
+        if terms and (not price_filter or terms[0].size <= high - low):
+            rows = terms[0].rows()
+            terms = terms[1:]
+        elif price_filter:
+            rows = np.sort(self.price_order[low:high])
+            price_filter = False
+        else:
+            return np.arange(self.row_count)
+
+        for term in terms:
+            if len(rows) == 0:
+                break
+            rows = rows[term.contains(rows)]
+
+        if price_filter and len(rows):
+            prices = self.prices[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if min_price is not None:
+                keep &= prices >= min_price
+            if max_price is not None:
+                keep &= prices <= max_price
+            rows = rows[keep]
+
+        # Day buckets are whole days; trim to the exact instants
+        if (start is not None or end is not None) and self.dates is not None and len(rows):
+            dates = self.dates[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= dates >= np.datetime64(start, 'ns')
+            if end is not None:
+                keep &= dates <= np.datetime64(end, 'ns')
+            rows = rows[keep]
+        return rows
+
+    def frame(self, **filters) -> pd.DataFrame:
+        """Matching rows of the indexed frame"""
+        return self.df.iloc[self.select(**filters)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the index's own arrays (dates and prices are views of the frame's columns)"""
+        arrays = [rows for postings in self.postings.values() for rows in postings.values()]
+        arrays += [bits for bitsets in self.bitsets.values() for bits in bitsets.values()]
+        if self.prices is not None:
+            arrays += [self.price_order, self.sorted_prices]
+        return sum(array.nbytes for array in arrays)
+
+    def get_status(self) -> Dict:
+        return {
+            'rows': self.row_count,
+            'values': {name: len(postings) for name, postings in self.postings.items()},
+            'bitsets': {name: len(bitsets) for name, bitsets in self.bitsets.items()},
+            'bitset_mb': round(sum(bits.nbytes for bitsets in self.bitsets.values()
+                                   for bits in bitsets.values()) / 2**20, 2),
+            'build_ms': round(self.elapsed * 1000, 1)
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar response formats for the dashboard API.
+
+Encodes a DataFrame directly to Apache Arrow IPC (streamed record batches),
+Parquet or MessagePack without building per-row Python dicts. The format is
+picked from an explicit ``format`` query parameter or the ``Accept`` header.
+pyarrow and msgpack are optional; formats whose library is missing are
+reported as unavailable.
+"""
+
+import io
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from flask import Response
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Mimetype -> format name. JSON first so that */* keeps the existing default.
+MIMETYPE_FORMATS = {
+    'application/json': 'json',
+    'text/csv': 'csv',
+    ARROW_MIMETYPE: 'arrow',
+    PARQUET_MIMETYPE: 'parquet',
+    'application/x-parquet': 'parquet',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack',
+}
+
+BINARY_FORMATS = ('arrow', 'parquet', 'msgpack')
+FILE_EXTENSIONS = {'arrow': 'arrows', 'parquet': 'parquet', 'msgpack': 'msgpack', 'csv': 'csv', 'json': 'json'}
+
+# Rows per Arrow record batch when streaming
+ARROW_BATCH_ROWS = 65536
+
+
+def available_formats() -> List[str]:
+    formats = ['json', 'csv']
+    if pa is not None:
+        formats += ['arrow', 'parquet']
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def negotiate_format(request, allowed: List[str], default: str = 'json') -> Optional[str]:
+    """
+    Pick a response format from ``?format=`` or the Accept header
+
+    Returns:
+        The format name, or None if ``?format=`` names something unsupported.
+        Accept headers that match nothing fall back to ``default``.
+    """
+    explicit = request.args.get('format')
+    if explicit:
+        return explicit if explicit in allowed else None
+
+    offered = [mimetype for mimetype, name in MIMETYPE_FORMATS.items() if name in allowed]
+    best = request.accept_mimetypes.best_match(offered, default=None)
+    return MIMETYPE_FORMATS[best] if best else default
+
+
+def _arrow_table(df: pd.DataFrame) -> 'pa.Table':
+    # Mixed-type object columns (e.g. python dates) are handled by pyarrow's inference
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _arrow_stream(table: 'pa.Table') -> Iterator[bytes]:
+    """Yield an Arrow IPC stream one record batch at a time"""
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        yield _drain(sink)
+        for batch in table.to_batches(max_chunksize=ARROW_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def _msgpack_columns(df: pd.DataFrame) -> bytes:
+    """Column-oriented MessagePack: {"columns": [...], "data": {column: [values]}}"""
+    data = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            # Epoch milliseconds, None for NaT
+            millis = values.values.astype('datetime64[ms]').astype(np.int64)
+            data[column] = np.where(values.isna(), None, millis).tolist()
+        elif pd.api.types.is_numeric_dtype(values):
+            data[column] = values.astype(object).where(values.notna(), None).tolist()
+        else:
+            data[column] = [None if pd.isna(v) else str(v) for v in values.to_numpy()]
+    return msgpack.packb({'columns': list(df.columns), 'rows': len(df), 'data': data})
+
+
+def frame_response(df: pd.DataFrame, fmt: str, filename: str = None) -> Response:
+    """
+    Encode a DataFrame as one of the binary columnar formats
+
+    Args:
+        df: Columnar data to send
+        fmt: 'arrow', 'parquet' or 'msgpack'
+        filename: Optional attachment filename stem
+    """
+    headers = {'Vary': 'Accept'}
+    if filename:
+        headers['Content-Disposition'] = f'attachment; filename={filename}.{FILE_EXTENSIONS[fmt]}'
+
+    if fmt == 'arrow':
+        return Response(_arrow_stream(_arrow_table(df)), mimetype=ARROW_MIMETYPE, headers=headers)
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        pq.write_table(_arrow_table(df), buffer, compression='snappy')
+        return Response(buffer.getvalue(), mimetype=PARQUET_MIMETYPE, headers=headers)
+    if fmt == 'msgpack':
+        return Response(_msgpack_columns(df), mimetype=MSGPACK_MIMETYPE, headers=headers)
+    raise ValueError(f"Unsupported binary format: {fmt}")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Background upstream health probing.
+
+A daemon thread probes the live API on an interval with a hard deadline and
+records the outcome, latency history and a circuit breaker state. Status
+endpoints read the cached result, so a health check never waits on the
+network however slow or unreachable the upstream is.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+def iso_timestamp(ts: Optional[float]) -> Optional[str]:
+    """Local ISO-8601 form of an epoch time, or None when unset"""
+    return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over consecutive failures
+
+    ``failure_threshold`` consecutive failures open the circuit. After
+    ``reset_timeout`` seconds one trial call is allowed (half-open); its
+    success closes the circuit and its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0, history: int = 20):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.transitions = deque(maxlen=history)
+
+    def _transition(self, state: str, reason: str):
+        if state != self.state:
+            logger.info(f"Upstream circuit {self.state} -> {state}: {reason}")
+            self.transitions.append({'from': self.state, 'to': state, 'at': datetime.now().isoformat(),
+                                     'reason': reason})
+            self.state = state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (moves open to half-open once the timeout passes)"""
+        with self.lock:
+            if self.state == STATE_OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self._transition(STATE_HALF_OPEN, 'reset timeout elapsed')
+            return self.state != STATE_OPEN
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self._transition(STATE_CLOSED, 'probe succeeded')
+
+    def record_failure(self, reason: str = ''):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.time()
+                self._transition(STATE_OPEN, reason or 'probe failed')
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'opened_at': iso_timestamp(self.opened_at) if self.state != STATE_CLOSED else None,
+                'transitions': list(self.transitions)
+            }
+
+
+class HealthProber:
+    """
+    Periodically runs ``probe`` in the background and caches the outcome
+
+    ``probe`` takes a timeout in seconds and returns the upstream API version
+    (raising on failure). Each probe also has a hard deadline enforced here,
+    since a request timeout does not bound DNS resolution or slow responses.
+    """
+
+    def __init__(self, probe: Callable[[float], str], interval: float = 30.0, timeout: float = 5.0,
+                 breaker: CircuitBreaker = None, history: int = 120):
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        self.lock = threading.Lock()
+        self.probe_lock = threading.Lock()
+        self.history = deque(maxlen=history)
+        self.api_version: Optional[str] = None
+        self.last_checked = 0.0
+        self.last_success = 0.0
+        self.last_error: Optional[str] = None
+        self.stats = {'probes': 0, 'failures': 0, 'timeouts': 0, 'skipped_open': 0}
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-probe')
+        self._pending = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def check(self) -> Dict:
+        """Run one probe now (subject to the breaker) and return the cached status"""
+        with self.probe_lock:
+            self._check()
+        return self.get_status()
+
+    def _check(self):
+        if not self.breaker.allow():
+            with self.lock:
+                self.stats['skipped_open'] += 1
+            return
+
+        started = time.perf_counter()
+        error = None
+        version = None
+        if self._pending is not None and not self._pending.done():
+            # The previous probe is still hung past its deadline
+            error = 'previous probe still running'
+        else:
+            self._pending = self._executor.submit(self.probe, self.timeout)
+            try:
+                version = self._pending.result(timeout=self.timeout)
+            except FutureTimeout:
+                error = f'timed out after {self.timeout:g}s'
+            except Exception as e:
+                error = str(e)
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        with self.lock:
+            self.stats['probes'] += 1
+            self.last_checked = time.time()
+            self.history.append({'checked': datetime.now().isoformat(), 'ok': error is None,
+                                 'latency_ms': latency_ms, 'error': error})
+            if error is None:
+                self.last_success = self.last_checked
+                self.last_error = None
+                self.api_version = version
+            else:
+                self.stats['failures'] += 1
+                self.stats['timeouts'] += error.startswith('timed out')
+                self.last_error = error
+
+        if error is None:
+            self.breaker.record_success()
+        else:
+            logger.warning(f"Upstream health probe failed: {error}")
+            self.breaker.record_failure(error)
+
+    def start(self):
+        """Probe in a daemon thread until stop() is called"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Health prober failed: {e}")
+                self._stop.wait(self.interval)
+
+        self._thread = threading.Thread(target=loop, name='health-prober', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def _latency_summary(latencies: List[float]) -> Dict:
+        if not latencies:
+            return {'last': None, 'p50': None, 'p95': None, 'max': None}
+        values = np.asarray(latencies)
+        return {
+            'last': latencies[-1],
+            'p50': round(float(np.percentile(values, 50)), 1),
+            'p95': round(float(np.percentile(values, 95)), 1),
+            'max': float(values.max())
+        }
+
+    def get_status(self, history: int = 20) -> Dict:
+        """Cached health; never touches the network"""
+        breaker = self.breaker.get_status()
+        with self.lock:
+            if not self.last_checked:
+                connectivity = 'UNKNOWN'
+            elif self.last_error is None:
+                connectivity = 'OK'
+            else:
+                connectivity = f'ERROR: {self.last_error}'
+            return {
+                'connectivity': connectivity,
+                'circuit': breaker['state'],
+                'api_version': self.api_version,
+                'last_checked': iso_timestamp(self.last_checked),
+                'last_success': iso_timestamp(self.last_success),
+                'last_error': self.last_error,
+                'probe_interval': self.interval,
+                'probe_timeout': self.timeout,
+                'latency_ms': self._latency_summary([p['latency_ms'] for p in self.history if p['ok']]),
+                'recent_probes': list(self.history)[-history:][::-1],
+                'breaker': breaker,
+                **self.stats
+            }
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Tiered live snapshot joining site details with live prices.
+
+The live API separates slow-changing metadata (GetFullSiteDetails, brands,
+fuel types, regions) from fast-changing prices (GetSitesPrices). This module
+refreshes each tier on its own TTL, hashes payloads to skip re-processing
+unchanged responses, and keeps a pre-joined table keyed by (SiteId, FuelId)
+so the dashboard can serve display-ready live rows from memory.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from qld_fuel_health import iso_timestamp
+from qld_fuel_upstream import PRIORITY_BACKGROUND
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _payload_hash(payload) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def _items(payload, key: str) -> List[Dict]:
+    """Pull the record list out of a live API payload ({key: [...]} or a bare list)"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        return payload.get(key) or []
+    return []
+
+
+class LiveSnapshot:
+    """
+    Pre-joined live prices with tiered refresh
+
+    Metadata is refreshed every ``metadata_ttl`` seconds (daily by default) and
+    prices every ``price_ttl`` seconds. Readers always see a complete snapshot:
+    refreshes build new dictionaries and swap them in under a lock.
+    """
+
+    def __init__(self, api_client, metadata_ttl: float = 86400, price_ttl: float = 60):
+        self.api_client = api_client
+        self.metadata_ttl = metadata_ttl
+        self.price_ttl = price_ttl
+
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.sites: Dict[int, Dict] = {}
+        self.fuels: Dict[int, str] = {}
+        self.brands: Dict[int, str] = {}
+        self.regions: Dict[Tuple[int, int], str] = {}
+        # (level, id) -> {name, abbrev, parent_id}, and site -> {level: region id} from G1..G5
+        self.region_tree: Dict[Tuple[int, int], Dict] = {}
+        self.site_regions: Dict[int, Dict[int, int]] = {}
+        self.rows: Dict[Tuple[int, int], Dict] = {}
+        self.board: List[Dict] = []
+        self.by_fuel: Dict[str, List[Dict]] = {}
+
+        # Bumped whenever new metadata is swapped in
+        self.metadata_version = 0
+        self.metadata_refreshed = 0.0
+        self.prices_refreshed = 0.0
+        self.hashes: Dict[str, str] = {}
+        self.stats = {'metadata_refreshes': 0, 'price_refreshes': 0, 'unchanged_payloads': 0,
+                      'joins': 0, 'errors': 0}
+        self._thread = None
+        self._stop = threading.Event()
+        # Called with the list of rows whose price changed after each join
+        self.listeners = []
+
+    def _changed(self, name: str, payload) -> bool:
+        """Record the payload hash, returning False if it matches the last one"""
+        digest = _payload_hash(payload)
+        if self.hashes.get(name) == digest:
+            self.stats['unchanged_payloads'] += 1
+            return False
+        self.hashes[name] = digest
+        return True
+
+    def _fetch(self, method) -> Optional[object]:
+        data = method(priority=PRIORITY_BACKGROUND)
+        if isinstance(data, dict) and 'error' in data:
+            self.stats['errors'] += 1
+            logger.warning(f"Live snapshot fetch failed: {data['error']}")
+            return None
+        return data
+
+    def _refresh_metadata(self) -> bool:
+        payloads = {
+            'sites': self._fetch(self.api_client.get_site_details),
+            'fuels': self._fetch(self.api_client.get_fuel_types),
+            'brands': self._fetch(self.api_client.get_brands),
+            'regions': self._fetch(self.api_client.get_geographic_regions),
+        }
+        if payloads['sites'] is None or payloads['fuels'] is None:
+            return False
+
+        changed = [name for name, payload in payloads.items() if payload is not None and self._changed(name, payload)]
+        self.metadata_refreshed = time.time()
+        self.stats['metadata_refreshes'] += 1
+        if not changed:
+            return False
+
+        brands = {b.get('BrandId'): b.get('Name') for b in _items(payloads['brands'], 'Brands')} \
+            if payloads['brands'] is not None else self.brands
+        if payloads['regions'] is not None:
+            region_tree = {(r.get('GeoRegionLevel'), r.get('GeoRegionId')): {
+                'name': r.get('Name'), 'abbrev': r.get('Abbrev'), 'parent_id': r.get('GeoRegionParentId')
+            } for r in _items(payloads['regions'], 'GeographicRegions')}
+        else:
+            region_tree = self.region_tree
+        regions = {key: region['name'] for key, region in region_tree.items()}
+        fuels = {f.get('FuelId'): f.get('Name') for f in _items(payloads['fuels'], 'Fuels')}
+
+        sites = {}
+        site_regions = {}
+        for site in _items(payloads['sites'], 'S'):
+            # G1 (suburb) .. G5; 0 or missing means the site has no region at that level
+            site_regions[site.get('S')] = {level: site.get(f'G{level}') for level in range(1, 6)
+                                           if site.get(f'G{level}')}
+            sites[site.get('S')] = {
+                'site_id': site.get('S'),
+                'site_name': site.get('N'),
+                'brand': brands.get(site.get('B')),
+                'address': site.get('A'),
+                'suburb': regions.get((1, site.get('G1'))),
+                'region': regions.get((2, site.get('G2'))),
+                'postcode': site.get('P'),
+                'latitude': site.get('Lat'),
+                'longitude': site.get('Lng'),
+            }
+
+        with self.lock:
+            self.sites, self.fuels, self.brands, self.regions = sites, fuels, brands, regions
+            self.region_tree, self.site_regions = region_tree, site_regions
+            self.metadata_version += 1
+        return True
+
+    def _refresh_prices(self, force_join: bool = False) -> bool:
+        payload = self._fetch(self.api_client.get_site_prices)
+        self.prices_refreshed = time.time()
+        self.stats['price_refreshes'] += 1
+        if payload is None:
+            return False
+        if not self._changed('prices', payload) and not force_join:
+            return False
+
+        with self.lock:
+            sites, fuels = self.sites, self.fuels
+
+        rows = {}
+        for price in _items(payload, 'SitePrices'):
+            site = sites.get(price.get('SiteId'))
+            raw = price.get('Price')
+            # Sites without details (or sentinel prices) are not displayable
+            if site is None or raw is None or raw >= 9999:
+                continue
+            key = (price.get('SiteId'), price.get('FuelId'))
+            rows[key] = {
+                **site,
+                'fuel_id': key[1],
+                'fuel_type': fuels.get(key[1]),
+                # Live prices use the same tenths-of-a-cent units as the open data
+                'price': raw / 1000,
+                'last_updated': price.get('TransactionDateUtc'),
+            }
+
+        board = sorted(rows.values(), key=lambda row: row['price'])
+        by_fuel = {}
+        for row in board:
+            by_fuel.setdefault(row['fuel_type'], []).append(row)
+        with self.lock:
+            previous = self.rows
+            self.rows, self.board, self.by_fuel = rows, board, by_fuel
+        self.stats['joins'] += 1
+
+        changed = [row for key, row in rows.items()
+                   if key not in previous or previous[key]['price'] != row['price']]
+        for listener in self.listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                logger.error(f"Live snapshot listener failed: {e}")
+        return True
+
+    def refresh(self, force: bool = False) -> Dict:
+        """Refresh whichever tiers are stale"""
+        with self.refresh_lock:
+            now = time.time()
+            metadata_changed = False
+            if force or now - self.metadata_refreshed >= self.metadata_ttl:
+                metadata_changed = self._refresh_metadata()
+            if force or metadata_changed or now - self.prices_refreshed >= self.price_ttl:
+                self._refresh_prices(force_join=metadata_changed)
+        return self.get_status()
+
+    def ensure_fresh(self):
+        """Refresh stale tiers on the caller's thread when no background refresher is running"""
+        if self._thread is None or not self._thread.is_alive():
+            self.refresh()
+
+    def start(self, interval: float = None):
+        """Refresh in a background thread so readers never wait on the network"""
+        if self._thread is not None:
+            return
+        interval = interval or self.price_ttl
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Live snapshot refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='live-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_price(self, site_id: int, fuel_id: int) -> Optional[Dict]:
+        with self.lock:
+            return self.rows.get((site_id, fuel_id))
+
+    def get_rows(self, fuel_type: str = None, suburb: str = None, site_id: int = None,
+                 limit: int = None) -> List[Dict]:
+        """Display-ready live rows, cheapest first"""
+        with self.lock:
+            board = self.by_fuel.get(fuel_type, []) if fuel_type else self.board
+        if suburb or site_id is not None:
+            board = [row for row in board
+                     if (not suburb or row['suburb'] == suburb)
+                     and (site_id is None or row['site_id'] == site_id)]
+        return board[:limit] if limit else board
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {
+                'sites': len(self.sites),
+                'live_rows': len(self.rows),
+                'fuel_types': sorted(name for name in self.fuels.values() if name),
+                'brands': sorted(name for name in self.brands.values() if name),
+                'metadata_refreshed': iso_timestamp(self.metadata_refreshed),
+                'prices_refreshed': iso_timestamp(self.prices_refreshed),
+                'metadata_ttl': self.metadata_ttl,
+                'price_ttl': self.price_ttl,
+                **self.stats
+            }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Load-test driver for the Queensland Fuel Price Dashboard.
+
+Runs concurrent dashboard traffic against the Flask app and reports throughput
+and p50/p95/p99 latency, overall and per endpoint. With --self-hosted it starts
+the fake upstream and the dashboard in-process so no network access is needed.
+
+Usage:
+    python3 qld_fuel_load_test.py --self-hosted --concurrency 16 --duration 30
+    python3 qld_fuel_load_test.py --url http://localhost:5008 --concurrency 32
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+import requests
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FUEL_TYPES = ['Unleaded', 'Diesel', 'e10', 'PULP 95/96 RON', 'PULP 98 RON']
+SUBURBS = ['Brisbane City', 'Southport', 'Chermside', 'Ipswich', 'Maroochydore', 'Townsville City']
+
+# (weight, name, path factory) for a typical dashboard session
+TRAFFIC_MIX = [
+    (1.0, 'data', lambda: '/api/data'),
+    (1.0, 'status', lambda: '/api/status'),
+    (5.0, 'cheapest', lambda: f"/api/cheapest?fuel_type={random.choice(FUEL_TYPES)}"
+                              f"&suburb={random.choice(SUBURBS + [''])}&limit=10"),
+    (2.0, 'prices', lambda: f"/api/prices?fuel_type={random.choice(FUEL_TYPES)}"
+                            f"&at=2025-01-{random.randint(2, 28):02d}T07:00:00"),
+    (1.0, 'cycles', lambda: f"/api/cycles?fuel_type={random.choice(FUEL_TYPES)}"),
+    (1.0, 'live', lambda: '/api/live'),
+    (0.5, 'export', lambda: f"/api/export?format=csv&fuel_type={random.choice(FUEL_TYPES)}"),
+]
+
+
+def _serve_in_thread(app, port: int = 0):
+    """Start a WSGI app on a background thread, returning its base URL"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def start_self_hosted(upstream_latency_ms: float = 0.0, error_rate: float = 0.0, sites: int = 1800) -> str:
+    """Start the fake upstream and the dashboard in-process, returning the dashboard URL"""
+    from qld_fuel_fake_upstream import FakeUpstreamConfig, create_app
+
+    upstream_url, _ = _serve_in_thread(create_app(FakeUpstreamConfig(
+        sites=sites, latency_ms=upstream_latency_ms, error_rate=error_rate
+    )))
+    os.environ['QLD_FUEL_API_BASE_URL'] = upstream_url
+    os.environ['QLD_FUEL_HISTORICAL_DATA_URL'] = f"{upstream_url}/csv"
+
+    import qld_fuel_web_app
+    qld_fuel_web_app.initialize_api()
+    qld_fuel_web_app.update_data_cache()
+    qld_fuel_web_app.live_snapshot.start()
+    qld_fuel_web_app.api_client.health.start()
+    dashboard_url, _ = _serve_in_thread(qld_fuel_web_app.app)
+    logger.info(f"Self-hosted dashboard at {dashboard_url} (upstream {upstream_url})")
+    return dashboard_url
+
+
+def run_load(base_url: str, concurrency: int = 8, duration: float = 10.0,
+             mix: List[Tuple] = None, timeout: float = 30.0) -> Dict[str, List[Tuple[float, int]]]:
+    """
+    Drive traffic for ``duration`` seconds from ``concurrency`` workers
+
+    Returns:
+        Mapping of endpoint name to (latency_seconds, status_code) samples
+    """
+    mix = mix or TRAFFIC_MIX
+    weights = [entry[0] for entry in mix]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            _, name, path = random.choices(mix, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = session.get(f"{base_url}{path()}", timeout=timeout).status_code
+            except requests.exceptions.RequestException:
+                status = 0
+            local[name].append((time.perf_counter() - started, status))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], duration: float) -> Dict:
+    """Throughput, error counts and latency percentiles (ms)"""
+    def describe(values):
+        latencies = np.array([v[0] for v in values]) * 1000
+        errors = sum(1 for v in values if v[1] == 0 or v[1] >= 500)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+        return {
+            'requests': len(values),
+            'errors': errors,
+            'throughput_rps': round(len(values) / duration, 1),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2)
+        }
+
+    everything = [v for values in samples.values() for v in values]
+    return {
+        'overall': describe(everything),
+        'endpoints': {name: describe(values) for name, values in sorted(samples.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the fuel price dashboard')
+    parser.add_argument('--url', help='Dashboard base URL (default: start a self-hosted stack)')
+    parser.add_argument('--self-hosted', action='store_true', help='Run the fake upstream and dashboard in-process')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of traffic')
+    parser.add_argument('--upstream-latency-ms', type=float, default=50.0, help='Fake upstream latency')
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0, help='Fake upstream error rate')
+    parser.add_argument('--sites', type=int, default=1800, help='Fake upstream site count')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    if args.url and not args.self_hosted:
+        base_url = args.url.rstrip('/')
+    else:
+        base_url = start_self_hosted(args.upstream_latency_ms, args.upstream_error_rate, args.sites)
+
+    print(f"Driving {args.concurrency} workers against {base_url} for {args.duration:.0f}s...")
+    report = summarize(run_load(base_url, args.concurrency, args.duration), args.duration)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'endpoint':<10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+    for name, row in rows:
+        print(f"{name:<10} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
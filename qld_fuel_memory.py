@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Memory accounting for the dashboard's cached structures.
+
+deep_sizeof walks an object graph once (shared objects counted once, pandas
+and NumPy sized natively, long record lists sampled) to attribute bytes to
+each cache. MemoryTracker samples process RSS while a data refresh runs to
+record its peak, and when tracemalloc tracing is switched on it snapshots
+every generation so the top allocation differences between the last two
+generations can be reported.
+"""
+
+import functools
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                  types.MethodType, types.CodeType, types.FrameType)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Lists of dicts longer than this are sized from SAMPLE_SIZE evenly spaced entries
+SAMPLE_MIN_LENGTH = 1000
+SAMPLE_SIZE = 64
+
+
+def _mb(size: Optional[float]) -> Optional[float]:
+    return round(size / 2**20, 2) if size is not None else None
+
+
+def deep_sizeof(obj, exclude: Iterable = ()) -> int:
+    """
+    Approximate bytes reachable from ``obj``
+
+    Objects in ``exclude`` (and anything only reachable through them) are not
+    counted, so structures that reference each other can be sized separately.
+    Functions, classes and modules are never followed. Long lists of dicts
+    (cached JSON records) are estimated from an evenly spaced sample, and
+    NumPy views count the bytes they span rather than their base array.
+    """
+    return _deep_sizeof(obj, {id(item) for item in exclude})
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIPPED_TYPES):
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            usage = item.memory_usage(index=True, deep=True)
+            total += int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+        elif isinstance(item, pd.Index):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            total += sys.getsizeof(item)
+            # A view's header excludes its data; its base may be far larger and is sized where it is owned
+            if item.base is not None:
+                total += item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel().tolist())
+        elif isinstance(item, (list, tuple)) and len(item) > SAMPLE_MIN_LENGTH and isinstance(item[0], dict):
+            total += sys.getsizeof(item)
+            step = len(item) / SAMPLE_SIZE
+            sampled = sum(_deep_sizeof(item[int(i * step)], seen) for i in range(SAMPLE_SIZE))
+            total += int(sampled * len(item) / SAMPLE_SIZE)
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            total += sys.getsizeof(item)
+            stack.extend(item)
+        else:
+            total += sys.getsizeof(item)
+            if hasattr(item, '__dict__'):
+                stack.append(vars(item))
+            for slot in getattr(type(item), '__slots__', ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size in bytes (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_peak_rss() -> Optional[int]:
+    """Lifetime peak resident set size in bytes"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def live_dataframes() -> Dict:
+    """Count and size of every DataFrame the garbage collector can see (catches leaked frames)"""
+    frames = [obj for obj in gc.get_objects() if isinstance(obj, pd.DataFrame)]
+    return {'count': len(frames), 'mb': _mb(sum(deep_sizeof(frame) for frame in frames))}
+
+
+class MemoryTracker:
+    """Peak memory of each data refresh and opt-in tracemalloc generation diffs"""
+
+    def __init__(self, sample_interval: float = 0.02):
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.last_refresh: Optional[Dict] = None
+        # (generation, snapshot) for the last two generations while tracing
+        self.snapshots = deque(maxlen=2)
+
+    def start_tracing(self, frames: int = 1):
+        """Begin tracemalloc tracing; each later refresh is snapshotted"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"tracemalloc started with {frames} frame(s)")
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self.lock:
+            self.snapshots.clear()
+
+    def tracked(self, func: Callable) -> Callable:
+        """Decorator recording the memory profile of each call as one generation"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rss_before = process_rss()
+            peak = [rss_before or 0]
+            done = threading.Event()
+
+            def sample():
+                while not done.wait(self.sample_interval):
+                    peak[0] = max(peak[0], process_rss() or 0)
+
+            sampler = threading.Thread(target=sample, name='refresh-memory-sampler', daemon=True)
+            sampler.start()
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                done.set()
+                sampler.join()
+                rss_after = process_rss()
+                peak[0] = max(peak[0], rss_after or 0)
+                self._record(started, rss_before, rss_after, peak[0] or None, tracing)
+
+        return wrapper
+
+    def _record(self, started: float, rss_before: Optional[int], rss_after: Optional[int],
+                rss_peak: Optional[int], tracing: bool):
+        traced_peak = tracemalloc.get_traced_memory()[1] if tracing else None
+        snapshot = None
+        if tracing:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            ))
+        with self.lock:
+            self.generation += 1
+            self.last_refresh = {
+                'generation': self.generation,
+                'finished': datetime.now().isoformat(),
+                'seconds': round(time.perf_counter() - started, 3),
+                'rss_before_mb': _mb(rss_before),
+                'rss_after_mb': _mb(rss_after),
+                'rss_peak_mb': _mb(rss_peak),
+                'peak_over_before_mb': _mb(rss_peak - rss_before) if rss_peak and rss_before else None,
+                'traced_peak_mb': _mb(traced_peak)
+            }
+            if snapshot is not None:
+                self.snapshots.append((self.generation, snapshot))
+
+    def top_differences(self, limit: int = 10, key_type: str = 'lineno') -> Dict:
+        """Largest allocation changes between the last two traced generations"""
+        with self.lock:
+            snapshots = list(self.snapshots)
+        result = {'tracing': tracemalloc.is_tracing(), 'generations': [generation for generation, _ in snapshots]}
+        if len(snapshots) < 2:
+            result['top'] = []
+            return result
+
+        (_, older), (_, newer) = snapshots
+        stats = newer.compare_to(older, key_type)
+        result['top'] = [{
+            'location': str(stat.traceback[0]) if stat.traceback else None,
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'size_kb': round(stat.size / 1024, 1),
+            'count_diff': stat.count_diff
+        } for stat in stats[:limit]]
+        return result
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            last_refresh = dict(self.last_refresh) if self.last_refresh else None
+        return {
+            'rss_mb': _mb(process_rss()),
+            'lifetime_peak_rss_mb': _mb(process_peak_rss()),
+            'last_refresh': last_refresh
+        }
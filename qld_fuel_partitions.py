@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Memory-budgeted month partitions over the on-disk historical dataset.
+
+The most recent months stay resident ("hot") for the dashboard's indexes.
+Older months are loaded from the partitioned Parquet dataset only when a
+query's date range touches them, and are evicted least-recently-used once
+resident partitions exceed the memory budget, so long history is available
+without holding all of it in RAM. Each resident month can also carry a
+FilterIndex, built on first filtered query and evicted with the month.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from qld_fuel_dataset import FuelPriceDataset
+from qld_fuel_filters import FilterIndex
+from qld_fuel_price_history import naive_utc
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+Month = Tuple[int, int]
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class MonthPartitionStore:
+    """
+    LRU cache of month frames with a byte budget
+
+    The newest ``hot_months`` completed months are pinned: they are never
+    evicted, even if they alone exceed the budget. Every other month is
+    loaded on first use and evicted oldest-access-first when the budget is
+    exceeded.
+    """
+
+    def __init__(self, dataset: FuelPriceDataset, budget_bytes: int, hot_months: int = 1):
+        self.dataset = dataset
+        self.budget_bytes = budget_bytes
+        self.hot_months = hot_months
+
+        self.lock = threading.Lock()
+        # Month -> (frame, bytes), least recently used first
+        self.resident: 'OrderedDict[Month, Tuple[pd.DataFrame, int]]' = OrderedDict()
+        # Filter indexes of resident months; their bytes count against the budget
+        self.indexes: Dict[Month, FilterIndex] = {}
+        self.loading: Dict[Month, threading.Event] = {}
+        self.months: List[Month] = []
+        self.pinned: set = set()
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0, 'load_errors': 0}
+        self.refresh_months()
+
+    def refresh_months(self) -> List[Month]:
+        """Re-scan the dataset for completed months and re-pin the newest ones"""
+        months = self.dataset.completed_months()
+        with self.lock:
+            self.months = months
+            self.pinned = set(months[-self.hot_months:]) if self.hot_months > 0 else set()
+            # Months rewritten or removed on disk are reloaded on next use
+            for month in [m for m in self.resident if m not in months]:
+                del self.resident[month]
+                self.indexes.pop(month, None)
+        return months
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self.resident.values()) + \
+            sum(index.nbytes for index in self.indexes.values())
+
+    def get_month(self, year: int, month: int) -> pd.DataFrame:
+        """One month's frame, loading it from disk on a miss"""
+        key = (year, month)
+        while True:
+            with self.lock:
+                if key in self.resident:
+                    self.stats['hits'] += 1
+                    self.resident.move_to_end(key)
+                    return self.resident[key][0]
+                pending = self.loading.get(key)
+                if pending is None:
+                    self.stats['misses'] += 1
+                    pending = self.loading[key] = threading.Event()
+                    break
+            # Another request is already loading this month
+            pending.wait()
+
+        df = pd.DataFrame()
+        try:
+            df = self.dataset.read_month(year, month)
+        except Exception as e:
+            with self.lock:
+                self.stats['load_errors'] += 1
+            logger.error(f"Failed to load partition {year}-{month:02d}: {e}")
+        finally:
+            # Publish the frame before waking waiters so they hit the cache instead of reading again
+            with self.lock:
+                self.stats['loads'] += 1
+                if not df.empty:
+                    self.resident[key] = (df, _frame_bytes(df))
+                    self._evict()
+                del self.loading[key]
+            pending.set()
+        return df
+
+    def _evict(self):
+        """Drop least recently used unpinned months until within budget"""
+        total = self.resident_bytes
+        for key in list(self.resident):
+            if total <= self.budget_bytes:
+                break
+            if key in self.pinned:
+                continue
+            total -= self.resident.pop(key)[1]
+            index = self.indexes.pop(key, None)
+            if index is not None:
+                total -= index.nbytes
+            self.stats['evictions'] += 1
+            logger.info(f"Evicted partition {key[0]}-{key[1]:02d}")
+
+    def months_between(self, start=None, end=None) -> List[Month]:
+        """Completed months overlapping [start, end]"""
+        low = pd.Period(naive_utc(start), 'M') if start is not None else None
+        high = pd.Period(naive_utc(end), 'M') if end is not None else None
+        with self.lock:
+            months = list(self.months)
+        return [(year, month) for year, month in months
+                if (low is None or pd.Period(year=year, month=month, freq='M') >= low)
+                and (high is None or pd.Period(year=year, month=month, freq='M') <= high)]
+
+    def hot_frame(self) -> pd.DataFrame:
+        """The pinned months combined, newest first (the dashboard's working set)"""
+        with self.lock:
+            pinned = sorted(self.pinned)
+        frames = [self.get_month(*month) for month in pinned]
+        # A single month is already sorted newest first; share it rather than copy it
+        return frames[0] if len(frames) == 1 else self._combine(frames)
+
+    def hot_start(self) -> Optional[pd.Timestamp]:
+        """First instant of the oldest pinned month"""
+        with self.lock:
+            pinned = sorted(self.pinned)
+        return pd.Period(year=pinned[0][0], month=pinned[0][1], freq='M').start_time if pinned else None
+
+    def carried_prices(self) -> pd.DataFrame:
+        """
+        Last change of each (site, fuel) series in the month before the hot months
+
+        The dataset stores changes only, so a series whose price did not change
+        during the hot months has no rows in them; these rows carry it in.
+        """
+        with self.lock:
+            months = list(self.months)
+            pinned = sorted(self.pinned)
+        if not pinned or months.index(pinned[0]) == 0:
+            return pd.DataFrame()
+        df = self.get_month(*months[months.index(pinned[0]) - 1])
+        if df.empty:
+            return df
+        latest = df.sort_values('transaction_date', ascending=False, kind='mergesort')
+        return latest.drop_duplicates(['site_id', 'fuel_type']).reset_index(drop=True)
+
+    def month_index(self, year: int, month: int) -> Optional[FilterIndex]:
+        """FilterIndex over one month's frame, built on first use (None for a missing month)"""
+        key = (year, month)
+        df = self.get_month(year, month)
+        if df.empty:
+            return None
+        with self.lock:
+            index = self.indexes.get(key)
+        if index is not None and index.df is df:
+            return index
+
+        index = FilterIndex(df)
+        with self.lock:
+            # Only keep it while the month it indexes is still resident
+            if key in self.resident and self.resident[key][0] is df:
+                self.indexes[key] = index
+                self._evict()
+        return index
+
+    def select(self, **filters) -> pd.DataFrame:
+        """
+        Rows matching FilterIndex.select filters in every month the date range touches
+
+        Returns:
+            Frame in the same shape as FuelPriceDataset.read, newest first
+        """
+        frames = []
+        for year, month in self.months_between(filters.get('start'), filters.get('end')):
+            index = self.month_index(year, month)
+            if index is not None:
+                frames.append(index.frame(**filters))
+        return self._combine(frames)
+
+    def query(self, start=None, end=None, fuel_types: Iterable[str] = None,
+              suburb: str = None) -> pd.DataFrame:
+        """
+        Changes between two instants, loading any months the range touches
+
+        Args:
+            start: Inclusive lower bound (default: earliest month)
+            end: Inclusive upper bound (default: latest month)
+            fuel_types: Optional fuel types to keep
+            suburb: Optional suburb to keep
+
+        Returns:
+            Frame in the same shape as FuelPriceDataset.read, newest first
+        """
+        frames = []
+        for year, month in self.months_between(start, end):
+            df = self.get_month(year, month)
+            if df.empty:
+                continue
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= df['transaction_date'] >= naive_utc(start)
+            if end is not None:
+                mask &= df['transaction_date'] <= naive_utc(end)
+            if fuel_types:
+                mask &= df['fuel_type'].isin(list(fuel_types))
+            if suburb:
+                mask &= df['suburb'] == suburb
+            frames.append(df[mask])
+        return self._combine(frames)
+
+    @staticmethod
+    def _combine(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return df.sort_values('transaction_date', ascending=False).reset_index(drop=True)
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            resident_bytes = self.resident_bytes
+            return {
+                'budget_mb': round(self.budget_bytes / 2**20, 1),
+                'resident_mb': round(resident_bytes / 2**20, 1),
+                'over_budget': resident_bytes > self.budget_bytes,
+                'available_months': len(self.months),
+                'resident_months': len(self.resident),
+                'partitions': [
+                    {
+                        'month': f"{year}-{month:02d}",
+                        'resident': (year, month) in self.resident,
+                        'pinned': (year, month) in self.pinned,
+                        'mb': round(self.resident[(year, month)][1] / 2**20, 2)
+                        if (year, month) in self.resident else None,
+                        'index_mb': round(self.indexes[(year, month)].nbytes / 2**20, 2)
+                        if (year, month) in self.indexes else None
+                    }
+                    for year, month in self.months
+                ],
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+                **self.stats
+            }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Retail price-cycle detection for Queensland fuel prices.
+
+Queensland petrol prices move in cycles: a sharp restoration jump followed by
+a run of small undercuts until the next restoration. This module detects those
+events for every (site, fuel) series at once using the flat arrays kept by
+PriceHistoryIndex, so a full year of changes is analysed without any
+per-station Python loops.
+"""
+
+import numpy as np
+import pandas as pd
+import time
+from typing import Dict, List
+import logging
+
+from qld_fuel_price_history import PriceHistoryIndex
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# The feed prices in tenths of a cent; steps are compared in that unit
+PRICE_UNITS_PER_DOLLAR = 1000
+
+# Phase labels, in cycle order
+PHASES = ['restoration', 'undercutting', 'trough', 'unknown']
+
+
+class PriceCycleAnalysis:
+    """
+    Per-series cycle state and per-suburb/brand rollups
+
+    Built once per data generation from a PriceHistoryIndex.
+    """
+
+    def __init__(self, history: PriceHistoryIndex, restoration_threshold: float = 0.08,
+                 undercut_threshold: float = 0.05, default_cycle_days: float = 7.0):
+        """
+        Run cycle detection over every series in the index
+
+        Args:
+            history: Index built for the current data generation
+            restoration_threshold: Minimum rise in $/L counted as a restoration
+            undercut_threshold: Maximum fall in $/L counted as an undercut step
+            default_cycle_days: Cycle length assumed for series with fewer than two restorations
+        """
+        started = time.perf_counter()
+        self.restoration_threshold = restoration_threshold
+        self.undercut_threshold = undercut_threshold
+        self.reference_time = history.end_time
+        self.series_count = history.series_count
+
+        if history.series_count == 0:
+            self.stations = pd.DataFrame()
+            self.elapsed = 0.0
+            return
+
+        keys, prices, seconds = history.keys, history.prices, history.seconds
+        n = len(prices)
+        series = (keys >> 32).astype(np.int64)
+        starts = history.series_start
+        ends = np.append(starts[1:], n) - 1
+
+        # Price step from the previous change in the same series, rounded to whole feed units
+        # so that a step exactly at a threshold classifies the same whatever the float error
+        delta = np.zeros(n, dtype=np.int64)
+        delta[1:] = np.rint((prices[1:] - prices[:-1]) * PRICE_UNITS_PER_DOLLAR)
+        delta[starts] = 0
+
+        restored = delta >= round(restoration_threshold * PRICE_UNITS_PER_DOLLAR)
+        undercut = (delta < 0) & (delta >= -round(undercut_threshold * PRICE_UNITS_PER_DOLLAR))
+
+        restorations = np.bincount(series, weights=restored, minlength=self.series_count).astype(np.int64)
+        undercuts = np.bincount(series, weights=undercut, minlength=self.series_count).astype(np.int64)
+
+        # First and last restoration row per series (rows are sorted by series then time)
+        restore_rows = np.flatnonzero(restored)
+        restore_series = series[restore_rows]
+        last_restore = np.full(self.series_count, -1, dtype=np.int64)
+        first_restore = np.full(self.series_count, -1, dtype=np.int64)
+        if len(restore_rows):
+            restored_series, first_pos = np.unique(restore_series, return_index=True)
+            last_pos = np.append(first_pos[1:], len(restore_rows)) - 1
+            first_restore[restored_series] = restore_rows[first_pos]
+            last_restore[restored_series] = restore_rows[last_pos]
+
+        has_restore = last_restore >= 0
+        last_restore_s = np.where(has_restore, seconds[np.maximum(last_restore, 0)], -1)
+        first_restore_s = np.where(has_restore, seconds[np.maximum(first_restore, 0)], -1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cycle_days = np.where(
+                restorations >= 2,
+                (last_restore_s - first_restore_s) / np.maximum(restorations - 1, 1) / SECONDS_PER_DAY,
+                np.nan
+            )
+        days_since = np.where(has_restore, (self.reference_time - last_restore_s) / SECONDS_PER_DAY, np.nan)
+
+        # Peak price since the last restoration, via reduceat over [last_restore, end] segments
+        current = prices[ends]
+        peak = current.copy()
+        if has_restore.any():
+            seg_start = last_restore[has_restore]
+            seg_stop = ends[has_restore] + 1
+            bounds = np.empty(2 * len(seg_start), dtype=np.int64)
+            bounds[0::2] = seg_start
+            bounds[1::2] = seg_stop
+            padded = np.append(prices, -np.inf)
+            peak[has_restore] = np.maximum.reduceat(padded, bounds)[0::2]
+        drop = peak - current
+
+        position = days_since / np.where(np.isnan(cycle_days), default_cycle_days, cycle_days)
+        phase = np.full(self.series_count, PHASES.index('unknown'), dtype=np.int64)
+        phase[has_restore & (position >= 0.75)] = PHASES.index('trough')
+        phase[has_restore & (position < 0.75)] = PHASES.index('undercutting')
+        phase[has_restore & ((days_since <= 1.5) | (drop <= 0))] = PHASES.index('restoration')
+
+        stations = history.series_meta[['site_name', 'site_brand', 'suburb', 'postcode']].copy()
+        stations.insert(0, 'site_id', history.series_site)
+        stations.insert(1, 'fuel_type', history.fuel_types[history.series_fuel])
+        stations['current_price'] = current
+        stations['peak_price'] = peak
+        stations['drop_since_restoration'] = drop
+        stations['restorations'] = restorations
+        stations['undercuts'] = undercuts
+        stations['cycle_days'] = cycle_days
+        stations['days_since_restoration'] = days_since
+        stations['phase'] = np.array(PHASES, dtype=object)[phase]
+        self.stations = stations
+
+        self.elapsed = time.perf_counter() - started
+        logger.info(f"Price cycle analysis: {self.series_count} series from {n} changes in {self.elapsed * 1000:.1f} ms")
+
+    def summarize(self, group_by: str = 'suburb', fuel_type: str = None) -> List[Dict]:
+        """
+        Estimate the cycle phase per suburb or brand
+
+        Args:
+            group_by: 'suburb' or 'brand'
+            fuel_type: Optional fuel type filter
+
+        Returns:
+            One record per group with the dominant phase and cycle statistics.
+            When phases tie for most stations, the one earliest in PHASES wins.
+        """
+        column = {'suburb': 'suburb', 'brand': 'site_brand'}[group_by]
+        stations = self.stations
+        if stations.empty:
+            return []
+        if fuel_type:
+            stations = stations[stations['fuel_type'] == fuel_type]
+            if stations.empty:
+                return []
+
+        grouped = stations.groupby([column, 'fuel_type'], sort=True)
+        summary = grouped.agg(
+            stations=('site_id', 'size'),
+            median_price=('current_price', 'median'),
+            median_cycle_days=('cycle_days', 'median'),
+            median_days_since_restoration=('days_since_restoration', 'median'),
+            restorations=('restorations', 'sum'),
+            undercuts=('undercuts', 'sum')
+        )
+        phase_counts = pd.crosstab([stations[column], stations['fuel_type']], stations['phase'])
+        counts = phase_counts.reindex(index=summary.index, columns=PHASES, fill_value=0).to_numpy()
+        # argmax returns the first maximum, so ties resolve in PHASES order
+        dominant = counts.argmax(axis=1)
+        summary['phase'] = np.array(PHASES, dtype=object)[dominant]
+        summary['phase_share'] = counts[np.arange(len(counts)), dominant] / counts.sum(axis=1)
+        summary = summary.reset_index().rename(columns={column: group_by})
+
+        # NaN is not valid JSON
+        summary = summary.astype(object).where(summary.notna(), None)
+        return summary.to_dict('records')
+
+    def station_phases(self, fuel_type: str = None, suburb: str = None) -> List[Dict]:
+        """Per-station cycle state, optionally filtered"""
+        stations = self.stations
+        if stations.empty:
+            return []
+        if fuel_type:
+            stations = stations[stations['fuel_type'] == fuel_type]
+        if suburb:
+            stations = stations[stations['suburb'] == suburb]
+        stations = stations.astype(object).where(stations.notna(), None)
+        return stations.rename(columns={'site_brand': 'brand'}).to_dict('records')
+
+
+def _synthetic_year(n_series: int, seed: int = 0) -> pd.DataFrame:
+    """Generate a year of cycling price changes for benchmarking"""
+    rng = np.random.default_rng(seed)
+    changes_per_series = 120
+    series = np.repeat(np.arange(n_series), changes_per_series)
+    steps = np.where(rng.random(len(series)) < 0.1, rng.uniform(0.15, 0.30, len(series)),
+                     -rng.uniform(0.005, 0.03, len(series)))
+    prices = 1.80 + pd.Series(steps).groupby(series).cumsum().to_numpy()
+    offsets = np.sort(rng.integers(0, 365 * SECONDS_PER_DAY, (n_series, changes_per_series)), axis=1).ravel()
+    return pd.DataFrame({
+        'site_id': series // 5,
+        'fuel_type': np.array(['Unleaded', 'Diesel', 'e10', 'PULP 95/96 RON', 'PULP 98 RON'])[series % 5],
+        'site_name': 'Station', 'site_brand': 'Brand', 'address': '', 'suburb': 'Suburb', 'postcode': 4000,
+        'latitude': -27.5, 'longitude': 153.0,
+        'price_dollars': prices,
+        'transaction_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='s')
+    })
+
+
+def main():
+    print("=== Price Cycle Detection Benchmark ===")
+    for n_series in (1000, 10000, 30000):
+        df = _synthetic_year(n_series)
+        started = time.perf_counter()
+        history = PriceHistoryIndex(df)
+        indexed = time.perf_counter() - started
+        analysis = PriceCycleAnalysis(history)
+        print(f"{n_series:>6} series, {len(df):>8} changes: index {indexed * 1000:8.1f} ms, "
+              f"cycles {analysis.elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+As-of price reconstruction for the Queensland changes-only price stream.
+
+The open-data files only record price changes, so the price at a station at
+any instant is the most recent change at or before that instant. This module
+keeps every (site, fuel) series sorted by timestamp in flat NumPy arrays and
+answers "what was the price board at time T" with one vectorized binary search.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Site metadata carried along with each (site, fuel) series
+SITE_COLUMNS = ['site_name', 'site_brand', 'address', 'suburb', 'postcode', 'latitude', 'longitude']
+
+# Price board columns, in output order
+BOARD_COLUMNS = ['site_id', 'fuel_type', 'site_name', 'brand', 'address', 'suburb', 'postcode',
+                 'latitude', 'longitude', 'price', 'last_updated']
+
+
+def naive_utc(at: Union[str, datetime, pd.Timestamp]) -> pd.Timestamp:
+    """Timestamp in naive UTC, the form stored transaction dates use (naive input is taken as UTC)"""
+    ts = pd.Timestamp(at)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts
+
+
+def epoch_seconds(at: Union[str, datetime, pd.Timestamp]) -> int:
+    """Whole seconds since the epoch of a timestamp in UTC"""
+    return int(naive_utc(at).value // 1_000_000_000)
+
+
+class PriceHistoryIndex:
+    """
+    Sorted change log indexed by (site_id, fuel_type)
+
+    Rows are ordered by series then timestamp and encoded as a single int64
+    key ``(series_id << 32) | seconds_since_base`` so that one searchsorted call
+    finds the last change at or before a given instant for every series.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from a cleaned historical DataFrame
+
+        Args:
+            df: Output of QLDFuelPriceAPI._clean_historical_data
+        """
+        df = df.dropna(subset=['transaction_date', 'price_dollars'])
+        df = df.sort_values(['site_id', 'fuel_type', 'transaction_date'], kind='mergesort')
+
+        self.record_count = len(df)
+        if df.empty:
+            self.base_time = None
+            self.end_time = None
+            self.series_count = 0
+            return
+
+        seconds = df['transaction_date'].values.astype('datetime64[s]').astype(np.int64)
+        self.base_time = int(seconds.min())
+        self.end_time = int(seconds.max())
+
+        site_ids = df['site_id'].to_numpy()
+        fuel_codes, self.fuel_types = pd.factorize(df['fuel_type'])
+        new_series = np.ones(len(df), dtype=bool)
+        new_series[1:] = (site_ids[1:] != site_ids[:-1]) | (fuel_codes[1:] != fuel_codes[:-1])
+        series_ids = np.cumsum(new_series) - 1
+
+        self.keys = (series_ids.astype(np.int64) << 32) | (seconds - self.base_time)
+        self.prices = df['price_dollars'].to_numpy(dtype=np.float64)
+        self.seconds = seconds
+
+        # Per-series metadata, taken from the most recent change of each series
+        starts = np.flatnonzero(new_series)
+        ends = np.append(starts[1:], len(df)) - 1
+        self.series_count = len(starts)
+        self.series_start = starts
+        self.series_fuel = fuel_codes[starts]
+        self.series_site = site_ids[starts]
+
+        latest = df.iloc[ends]
+        self.series_meta = latest[SITE_COLUMNS].reset_index(drop=True)
+        suburb_codes, self.suburbs = pd.factorize(self.series_meta['suburb'])
+        self.series_suburb = suburb_codes
+
+        # Board fields that do not depend on the instant, so queries only gather them
+        static = self.series_meta.rename(columns={'site_brand': 'brand'})
+        static.insert(0, 'site_id', self.series_site)
+        static.insert(1, 'fuel_type', self.fuel_types[self.series_fuel])
+        self.static_columns = {name: static[name].to_numpy(dtype=object) for name in BOARD_COLUMNS[:-2]}
+
+        self._fuel_lookup = {fuel: code for code, fuel in enumerate(self.fuel_types)}
+        self._suburb_lookup = {suburb: code for code, suburb in enumerate(self.suburbs)}
+
+        logger.info(f"Price history index built: {self.record_count} changes across {self.series_count} series")
+
+    def _series_mask(self, fuel_type: Optional[str], suburb: Optional[str]) -> Optional[np.ndarray]:
+        mask = np.ones(self.series_count, dtype=bool)
+        if fuel_type:
+            code = self._fuel_lookup.get(fuel_type)
+            if code is None:
+                return None
+            mask &= self.series_fuel == code
+        if suburb:
+            code = self._suburb_lookup.get(suburb)
+            if code is None:
+                return None
+            mask &= self.series_suburb == code
+        return mask
+
+    def board_at(self, at: Union[str, datetime, pd.Timestamp], fuel_type: str = None,
+                 suburb: str = None) -> Dict[str, List]:
+        """
+        Reconstruct the price board as of a given instant, column by column
+
+        Args:
+            at: Instant to query (naive values are treated as UTC)
+            fuel_type: Optional fuel type filter
+            suburb: Optional suburb filter
+
+        Returns:
+            BOARD_COLUMNS -> list of values, one per (site, fuel) with a
+            known price, cheapest first
+        """
+        empty = {name: [] for name in BOARD_COLUMNS}
+        if self.series_count == 0:
+            return empty
+
+        offset = epoch_seconds(at) - self.base_time
+        if offset < 0:
+            return empty
+        offset = min(offset, (1 << 32) - 1)
+
+        mask = self._series_mask(fuel_type, suburb)
+        if mask is None:
+            return empty
+        series = np.flatnonzero(mask)
+
+        query = (series.astype(np.int64) << 32) | offset
+        idx = np.searchsorted(self.keys, query, side='right') - 1
+        known = idx >= self.series_start[series]
+        series, idx = series[known], idx[known]
+
+        order = np.argsort(self.prices[idx], kind='stable')
+        series, idx = series[order], idx[order]
+
+        board = {name: values[series].tolist() for name, values in self.static_columns.items()}
+        board['price'] = self.prices[idx].tolist()
+        board['last_updated'] = np.char.replace(
+            np.datetime_as_string(self.seconds[idx].astype('datetime64[s]')), 'T', ' ').tolist()
+        return board
+
+    def prices_at(self, at: Union[str, datetime, pd.Timestamp], fuel_type: str = None,
+                  suburb: str = None) -> List[Dict]:
+        """
+        Reconstruct the price board as of a given instant, one record per row
+
+        Same arguments as board_at. Returns one record per (site, fuel) with
+        a known price, cheapest first.
+        """
+        board = self.board_at(at, fuel_type, suburb)
+        return [dict(zip(BOARD_COLUMNS, row)) for row in zip(*(board[name] for name in BOARD_COLUMNS))]
+
+    def get_coverage(self) -> Dict:
+        """Time span covered by the loaded changes"""
+        if self.series_count == 0:
+            return {'start': None, 'end': None, 'records': 0, 'series': 0}
+        return {
+            'start': pd.Timestamp(self.base_time, unit='s').isoformat(),
+            'end': pd.Timestamp(self.end_time, unit='s').isoformat(),
+            'records': self.record_count,
+            'series': self.series_count
+        }
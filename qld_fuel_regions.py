@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Region hierarchy rollups over the live snapshot.
+
+GetCountryGeographicRegions describes a hierarchy (level 1 suburbs, level 2
+regions, level 3 state) and each site carries its region id at every level
+(G1..G5). Sites are mapped to all of their regions once per metadata
+refresh; after that, each price change moves one entry within the sorted
+price list of every region it belongs to, so region statistics and
+cheapest-station lists are always precomputed rather than scanned.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+RegionKey = Tuple[int, int]
+
+
+class _PriceBucket:
+    """(price, site_id) entries for one region and fuel, kept sorted"""
+    __slots__ = ('entries', 'total')
+
+    def __init__(self):
+        self.entries: List[Tuple[float, int]] = []
+        self.total = 0.0
+
+    def add(self, price: float, site_id: int):
+        bisect.insort(self.entries, (price, site_id))
+        self.total += price
+
+    def remove(self, price: float, site_id: int):
+        position = bisect.bisect_left(self.entries, (price, site_id))
+        if position < len(self.entries) and self.entries[position] == (price, site_id):
+            del self.entries[position]
+            self.total -= price
+
+    def stats(self) -> Dict:
+        count = len(self.entries)
+        if count == 0:
+            return {'stations': 0, 'mean': None, 'min': None, 'max': None, 'median': None}
+        middle = count // 2
+        median = self.entries[middle][0] if count % 2 else (self.entries[middle - 1][0] + self.entries[middle][0]) / 2
+        return {
+            'stations': count,
+            'mean': round(self.total / count, 4),
+            'min': self.entries[0][0],
+            'max': self.entries[-1][0],
+            'median': round(median, 4)
+        }
+
+
+class RegionRollups:
+    """
+    Per-region, per-fuel price statistics at every hierarchy level
+
+    Register ``apply`` as a LiveSnapshot listener. When the snapshot's
+    metadata changes, rollups are rebuilt from all live rows; otherwise only
+    the changed rows are applied.
+    """
+
+    def __init__(self, snapshot, cheapest: int = 10):
+        self.snapshot = snapshot
+        self.cheapest = cheapest
+
+        self.lock = threading.Lock()
+        self.metadata_version = None
+        self.regions: Dict[RegionKey, Dict] = {}
+        self.children: Dict[RegionKey, List[int]] = defaultdict(list)
+        self.memberships: Dict[int, List[RegionKey]] = {}
+        # (level, region id) -> fuel type -> bucket
+        self.buckets: Dict[RegionKey, Dict[str, _PriceBucket]] = defaultdict(lambda: defaultdict(_PriceBucket))
+        # (site_id, fuel_id) -> the live row currently counted in the buckets
+        self.current: Dict[Tuple[int, int], Dict] = {}
+        self.fuel_ids: Dict[str, int] = {}
+        self.stats = {'rebuilds': 0, 'incremental_updates': 0, 'rows_applied': 0, 'rows_removed': 0}
+        self.elapsed = 0.0
+
+    def _memberships(self, site_regions: Dict[int, Dict[int, int]]) -> Dict[int, List[RegionKey]]:
+        """Every region a site belongs to, filling missing levels from the parent chain"""
+        memberships = {}
+        for site_id, levels in site_regions.items():
+            keys = set()
+            for level, region_id in levels.items():
+                key = (level, region_id)
+                while key not in keys:
+                    keys.add(key)
+                    parent_id = self.regions.get(key, {}).get('parent_id')
+                    if not parent_id:
+                        break
+                    key = (key[0] + 1, parent_id)
+            memberships[site_id] = sorted(keys)
+        return memberships
+
+    def _add_row(self, key: Tuple[int, int], row: Dict):
+        self.current[key] = row
+        for region in self.memberships.get(row['site_id'], ()):
+            self.buckets[region][row['fuel_type']].add(row['price'], row['site_id'])
+
+    def _remove_row(self, key: Tuple[int, int]):
+        row = self.current.pop(key, None)
+        if row is None:
+            return
+        for region in self.memberships.get(row['site_id'], ()):
+            bucket = self.buckets.get(region, {}).get(row['fuel_type'])
+            if bucket is not None:
+                bucket.remove(row['price'], row['site_id'])
+
+    def apply(self, changed: Iterable[Dict] = ()):
+        """Bring the rollups up to date with the snapshot (LiveSnapshot listener)"""
+        started = time.perf_counter()
+        with self.snapshot.lock:
+            version = self.snapshot.metadata_version
+            region_tree, site_regions = self.snapshot.region_tree, self.snapshot.site_regions
+            fuels, rows = self.snapshot.fuels, self.snapshot.rows
+
+        with self.lock:
+            if version != self.metadata_version:
+                self._rebuild(version, region_tree, site_regions, fuels, rows)
+            else:
+                self.stats['incremental_updates'] += 1
+                for row in changed:
+                    if row.get('fuel_type') is None:
+                        continue
+                    key = (row['site_id'], row['fuel_id'])
+                    self._remove_row(key)
+                    self._add_row(key, row)
+                    self.stats['rows_applied'] += 1
+                # Fuels a site no longer reports
+                for key in self.current.keys() - rows.keys():
+                    self._remove_row(key)
+                    self.stats['rows_removed'] += 1
+            self.elapsed = time.perf_counter() - started
+
+    def _rebuild(self, version, region_tree: Dict[RegionKey, Dict], site_regions: Dict[int, Dict[int, int]],
+                 fuels: Dict[int, str], rows: Dict[Tuple[int, int], Dict]):
+        self.regions = dict(region_tree)
+        self.children = defaultdict(list)
+        for (level, region_id), region in self.regions.items():
+            if region.get('parent_id'):
+                self.children[(level + 1, region['parent_id'])].append(region_id)
+        self.memberships = self._memberships(site_regions)
+        self.fuel_ids = {name: fuel_id for fuel_id, name in fuels.items()}
+        self.buckets = defaultdict(lambda: defaultdict(_PriceBucket))
+        self.current = {}
+        for key, row in rows.items():
+            if row.get('fuel_type') is not None:
+                self._add_row(key, row)
+        self.metadata_version = version
+        self.stats['rebuilds'] += 1
+        logger.info(f"Region rollups rebuilt: {len(self.regions)} regions, {len(self.current)} live prices")
+
+    def _region_info(self, level: int, region_id: int) -> Dict:
+        region = self.regions.get((level, region_id), {})
+        parent_id = region.get('parent_id')
+        return {
+            'level': level,
+            'id': region_id,
+            'name': region.get('name'),
+            'abbrev': region.get('abbrev'),
+            'parent': {'level': level + 1, 'id': parent_id,
+                       'name': self.regions.get((level + 1, parent_id), {}).get('name')} if parent_id else None
+        }
+
+    def _cheapest(self, bucket: _PriceBucket, fuel_type: str, limit: int) -> List[Dict]:
+        rows = []
+        fuel_id = self.fuel_ids.get(fuel_type)
+        for _, site_id in bucket.entries[:limit]:
+            row = self.current.get((site_id, fuel_id))
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def get_region(self, level: int, region_id: int, fuel_type: str = None, limit: int = None) -> Optional[Dict]:
+        """
+        Statistics and cheapest stations for one region
+
+        Args:
+            level: Hierarchy level (1 suburb, 2 region, 3 state)
+            region_id: GeoRegionId at that level
+            fuel_type: Optional fuel type (default: every fuel sold in the region)
+            limit: Cheapest stations per fuel (default: ``cheapest``)
+
+        Returns:
+            Region details with per-fuel rollups, or None for an unknown region
+        """
+        limit = self.cheapest if limit is None else max(limit, 0)
+        with self.lock:
+            if (level, region_id) not in self.regions:
+                return None
+            fuels = {}
+            for bucket_fuel, bucket in self.buckets.get((level, region_id), {}).items():
+                if bucket.entries and (not fuel_type or bucket_fuel == fuel_type):
+                    fuels[bucket_fuel] = {**bucket.stats(), 'cheapest': self._cheapest(bucket, bucket_fuel, limit)}
+            return {
+                **self._region_info(level, region_id),
+                'children': len(self.children.get((level, region_id), [])),
+                'fuels': dict(sorted(fuels.items()))
+            }
+
+    def get_level(self, level: int, fuel_type: str) -> List[Dict]:
+        """Every region at a level with its statistics for one fuel, cheapest mean first"""
+        with self.lock:
+            results = []
+            for (region_level, region_id) in self.regions:
+                if region_level != level:
+                    continue
+                bucket = self.buckets.get((level, region_id), {}).get(fuel_type)
+                if bucket is None or not bucket.entries:
+                    continue
+                results.append({**self._region_info(level, region_id), 'fuel_type': fuel_type, **bucket.stats()})
+        return sorted(results, key=lambda region: region['mean'])
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            levels = defaultdict(int)
+            for level, _ in self.regions:
+                levels[level] += 1
+            return {
+                'regions_by_level': dict(sorted(levels.items())),
+                'sites_mapped': len(self.memberships),
+                'live_prices': len(self.current),
+                'buckets': sum(1 for fuels in self.buckets.values() for bucket in fuels.values() if bucket.entries),
+                'last_apply_ms': round(self.elapsed * 1000, 2),
+                **self.stats
+            }
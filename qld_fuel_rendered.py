@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Pre-encoded, precompressed JSON responses.
+
+When a new data generation is published, each cacheable response variant is
+serialized once and compressed (gzip, plus Brotli when installed). Requests
+are answered with those bytes directly, with an ETag for conditional GETs, so
+serving the common payloads costs no encoding work per request. The rare
+client that accepts no compression gets the gzip body, decompressed once on
+first demand and kept for the rest of the generation.
+"""
+
+import gzip
+import hashlib
+import time
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+# Brotli quality 5 compresses better than gzip -6 at similar speed
+BROTLI_QUALITY = 5
+
+
+class RenderedVariant:
+    """One response body in every stored encoding"""
+    __slots__ = ('etag', 'encodings', 'raw_bytes', 'identity')
+
+    def __init__(self, body: bytes):
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.raw_bytes = len(body)
+        self.encodings: Dict[str, bytes] = {'gzip': gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+        self.identity: Optional[bytes] = None
+
+    def body(self, encoding: str) -> bytes:
+        if encoding == 'identity':
+            # Concurrent first requests may both decompress; either copy is the same bytes
+            if self.identity is None:
+                self.identity = gzip.decompress(self.encodings['gzip'])
+            return self.identity
+        return self.encodings[encoding]
+
+
+class PrerenderedResponses:
+    """
+    Encoded response variants for one data generation
+
+    Build a new instance per generation and swap it in; apart from the lazily
+    cached identity bodies, instances are never modified after publishing, so
+    readers need no locking.
+    """
+
+    def __init__(self, encode: Callable[[Any], bytes], mimetype: str = 'application/json'):
+        self.encode = encode
+        self.mimetype = mimetype
+        self.variants: Dict[str, RenderedVariant] = {}
+        self.elapsed = 0.0
+
+    def add(self, name: str, payload: Any):
+        started = time.perf_counter()
+        self.variants[name] = RenderedVariant(self.encode(payload))
+        self.elapsed += time.perf_counter() - started
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.variants
+
+    def respond(self, request, name: str) -> Optional[Response]:
+        """
+        Serve a variant, negotiating Content-Encoding and honouring If-None-Match
+
+        Returns:
+            The response, or None if no such variant was rendered
+        """
+        variant = self.variants.get(name)
+        if variant is None:
+            return None
+
+        # The same URL can also be served as Arrow, Parquet or MessagePack depending on Accept
+        headers = {'ETag': f'"{variant.etag}"', 'Vary': 'Accept, Accept-Encoding', 'Cache-Control': 'no-cache'}
+        if variant.etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in variant.encodings and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(variant.body(encoding), mimetype=self.mimetype, headers=headers)
+
+    def get_status(self) -> Dict:
+        return {
+            'variants': len(self.variants),
+            'encodings': ['gzip'] + (['br'] if brotli is not None else []),
+            'raw_mb': round(sum(v.raw_bytes for v in self.variants.values()) / 2**20, 2),
+            'stored_mb': round(sum(len(body) for v in self.variants.values()
+                                   for body in v.encodings.values()) / 2**20, 2),
+            'identity_cached_mb': round(sum(v.raw_bytes for v in self.variants.values()
+                                            if v.identity is not None) / 2**20, 2),
+            'render_ms': round(self.elapsed * 1000, 1)
+        }
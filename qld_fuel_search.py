@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Autocomplete search over suburbs, postcodes, station names and brands.
+
+Built once per data generation. Prefix matches come from a character trie whose
+nodes keep the best-ranked entries below them, so a lookup is one walk down the
+trie. Misspellings fall back to trigram similarity over an inverted index.
+"""
+
+import heapq
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('suburb', 'postcode', 'station', 'brand')
+
+# Entries of each kind kept per trie node; deeper prefixes are needed to reach anything further down the ranking
+NODE_CAPACITY = 50
+
+# Minimum Dice similarity for a fuzzy match
+FUZZY_THRESHOLD = 0.35
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text) -> str:
+    return _NON_ALNUM.sub(' ', str(text).lower()).strip()
+
+
+def postcode_key(value) -> Optional[str]:
+    """Postcode as a digit string whether stored as int, float or text (None when missing)"""
+    if value is None or pd.isna(value):
+        return None
+    try:
+        return str(int(float(value)))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        # Kind -> entry ids below this node, best-ranked first
+        self.entries: Dict[str, List[int]] = {}
+
+
+class SearchIndex:
+    """Prefix trie plus trigram index over autocomplete entries"""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from a cleaned historical DataFrame
+
+        Args:
+            df: Output of QLDFuelPriceAPI._clean_historical_data
+        """
+        started = time.perf_counter()
+        self.entries: List[Dict] = []
+        self.root = _TrieNode()
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.entry_trigrams: List[int] = []
+
+        if not df.empty:
+            # Frame is newest-first, so the first row per site carries its current details
+            sites = df.drop_duplicates('site_id')[['site_id', 'site_name', 'site_brand', 'suburb', 'postcode']]
+            self._add_entries(sites)
+
+        # Rank every node's entries once: higher weight first, then shorter labels.
+        # Capping per kind keeps a kind filter from coming up empty when other kinds fill a node
+        ranked = sorted(range(len(self.entries)), key=lambda entry_id: (
+            -self.entries[entry_id]['weight'], len(self.entries[entry_id]['label']), self.entries[entry_id]['label']))
+        self.rank = [0] * len(self.entries)
+        for position, entry_id in enumerate(ranked):
+            self.rank[entry_id] = position
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.entries = {kind: sorted(set(ids), key=self.rank.__getitem__)[:NODE_CAPACITY]
+                            for kind, ids in node.entries.items()}
+            stack.extend(node.children.values())
+
+        self.elapsed = time.perf_counter() - started
+        logger.info(f"Search index built: {len(self.entries)} entries in {self.elapsed * 1000:.1f} ms")
+
+    def _add_entries(self, sites: pd.DataFrame):
+        suburb_counts = sites.groupby('suburb')['site_id'].nunique()
+        suburb_postcodes = sites.groupby('suburb')['postcode'].first()
+        for suburb, count in suburb_counts.items():
+            self._add('suburb', suburb, suburb, count, postcode=postcode_key(suburb_postcodes.get(suburb)))
+
+        postcode_counts = sites.groupby('postcode')['site_id'].nunique()
+        postcode_suburbs = sites.groupby('postcode')['suburb'].agg(lambda s: sorted(s.dropna().unique().tolist()))
+        for postcode, count in postcode_counts.items():
+            postcode = postcode_key(postcode)
+            suburbs = postcode_suburbs.get(int(postcode), []) if postcode.isdigit() else []
+            self._add('postcode', postcode, postcode, count, suburbs=suburbs)
+
+        brand_counts = sites.groupby('site_brand')['site_id'].nunique()
+        for brand, count in brand_counts.items():
+            self._add('brand', brand, brand, count)
+
+        for site in sites.itertuples(index=False):
+            if pd.isna(site.site_name):
+                continue
+            self._add('station', site.site_name, int(site.site_id), 1,
+                      brand=site.site_brand, suburb=site.suburb, postcode=postcode_key(site.postcode))
+
+    def _add(self, kind: str, label, value, weight: int, **extra):
+        if label is None or pd.isna(label):
+            return
+        label = str(label)
+        text = normalize(label)
+        if not text:
+            return
+        entry_id = len(self.entries)
+        self.entries.append({'kind': kind, 'label': label, 'value': value, 'weight': int(weight),
+                             'text': text, **extra})
+
+        # Index the full label and every word start, so "paradise" finds "Surfers Paradise"
+        words = text.split(' ')
+        for i in range(len(words)):
+            node = self.root
+            for char in ' '.join(words[i:]):
+                node = node.children.setdefault(char, _TrieNode())
+                node.entries.setdefault(kind, []).append(entry_id)
+
+        grams = trigrams(text)
+        self.entry_trigrams.append(len(grams))
+        for gram in grams:
+            self.postings[gram].append(entry_id)
+
+    def _prefix(self, text: str, kinds: Optional[set]) -> List[int]:
+        """Ranked entries under a prefix, limited to ``kinds`` (None for all)"""
+        node = self.root
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        lists = [ids for kind, ids in node.entries.items() if kinds is None or kind in kinds]
+        return list(heapq.merge(*lists, key=self.rank.__getitem__))
+
+    def _fuzzy(self, text: str, exclude: set) -> List[tuple]:
+        grams = trigrams(text)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+        scored = []
+        for entry_id, common in counts.items():
+            if entry_id in exclude:
+                continue
+            score = 2 * common / (len(grams) + self.entry_trigrams[entry_id])
+            if score >= FUZZY_THRESHOLD:
+                scored.append((score, entry_id))
+        scored.sort(key=lambda item: (-item[0], -self.entries[item[1]]['weight']))
+        return scored
+
+    def search(self, query: str, limit: int = 10, kinds: Iterable[str] = None) -> List[Dict]:
+        """
+        Ranked autocomplete results
+
+        Exact matches rank first, then prefix matches by weight, then fuzzy
+        trigram matches by similarity.
+        """
+        text = normalize(query)
+        if not text or limit <= 0:
+            return []
+        kinds = set(kinds) if kinds else None
+
+        def wanted(entry_id):
+            return kinds is None or self.entries[entry_id]['kind'] in kinds
+
+        prefix = self._prefix(text, kinds)
+        prefix.sort(key=lambda entry_id: self.entries[entry_id]['text'] != text)
+        results = [(1.0 if self.entries[entry_id]['text'] == text else 0.9, 'prefix', entry_id)
+                   for entry_id in prefix[:limit]]
+
+        if len(results) < limit and len(text) >= 3:
+            seen = {entry_id for _, _, entry_id in results}
+            for score, entry_id in self._fuzzy(text, seen):
+                if wanted(entry_id):
+                    results.append((round(score * 0.8, 3), 'fuzzy', entry_id))
+                    if len(results) >= limit:
+                        break
+
+        output = []
+        for score, match, entry_id in results:
+            entry = {k: v for k, v in self.entries[entry_id].items() if k != 'text'}
+            entry.update({'score': score, 'match': match})
+            output.append(entry)
+        return output
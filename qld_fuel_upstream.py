@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Upstream request controls for the Queensland Fuel Prices live API.
+
+Protects the subscriber token's quota with:
+1. A token-bucket rate limiter with priority classes
+2. In-flight coalescing so identical concurrent requests share one upstream call
+3. A short TTL response cache
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first. Lower classes may only spend tokens above
+# their reserve so that user-facing requests are never starved by background work.
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+
+DEFAULT_RESERVES = {
+    PRIORITY_INTERACTIVE: 0.0,
+    PRIORITY_BACKGROUND: 0.5
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token could not be acquired before the deadline"""
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket with priority reserves
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``. A
+    request of a given priority may only take a token while the bucket holds
+    more than ``reserve * capacity`` tokens.
+    """
+
+    def __init__(self, rate: float = 2.0, capacity: float = 10.0, reserves: Dict[str, float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.reserves = dict(reserves or DEFAULT_RESERVES)
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+        self.stats = {'granted': 0, 'rejected': 0, 'waited_seconds': 0.0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority: str = PRIORITY_INTERACTIVE, timeout: float = 10.0) -> bool:
+        """
+        Take one token, waiting up to ``timeout`` seconds
+
+        Returns:
+            True if a token was granted
+        """
+        floor = self.reserves.get(priority, 0.0) * self.capacity
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self.condition:
+            while True:
+                self._refill()
+                if self.tokens - 1 >= floor:
+                    self.tokens -= 1
+                    self.stats['granted'] += 1
+                    self.stats['waited_seconds'] += time.monotonic() - started
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['rejected'] += 1
+                    return False
+                needed = (floor + 1 - self.tokens) / self.rate
+                self.condition.wait(min(remaining, max(needed, 0.001)))
+
+    def get_status(self) -> Dict:
+        with self.condition:
+            self._refill()
+            return {
+                'rate_per_second': self.rate,
+                'capacity': self.capacity,
+                'available_tokens': round(self.tokens, 2),
+                'reserves': self.reserves,
+                **self.stats
+            }
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """
+    Share one in-flight call between identical concurrent requests
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running block and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight: Dict[Hashable, _InFlightCall] = {}
+        self.stats = {'leaders': 0, 'coalesced': 0}
+
+    def call(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self.in_flight[key] = _InFlightCall()
+                self.stats['leaders'] += 1
+            else:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call.done.set()
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {'in_flight': len(self.in_flight), **self.stats}
+
+
+class TTLCache:
+    """Small thread-safe response cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.stats['hits'] += 1
+                return True, entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.stats['misses'] += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        with self.lock:
+            if len(self.entries) >= self.max_entries and key not in self.entries:
+                # Drop the entry closest to expiry
+                oldest = min(self.entries, key=lambda k: self.entries[k][0])
+                del self.entries[oldest]
+            self.entries[key] = (time.monotonic() + ttl, value)
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {'entries': len(self.entries), **self.stats}
+
+
+class UpstreamGuard:
+    """
+    Cache, coalescing and rate limiting applied to every upstream call
+
+    ``fetch`` returns a cached response if one is fresh, otherwise joins an
+    identical in-flight call, otherwise waits for a rate-limit token and runs
+    the request.
+    """
+
+    def __init__(self, rate: float = 2.0, capacity: float = 10.0, acquire_timeout: float = 10.0,
+                 reserves: Dict[str, float] = None):
+        self.limiter = TokenBucketRateLimiter(rate, capacity, reserves)
+        self.coalescer = RequestCoalescer()
+        self.cache = TTLCache()
+        self.acquire_timeout = acquire_timeout
+
+    def fetch(self, key: Hashable, func: Callable[[], Any], ttl: float = 0,
+              priority: str = PRIORITY_INTERACTIVE, cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        Run ``func`` under cache, coalescing and rate limiting
+
+        Args:
+            key: Identity of the request (endpoint plus parameters)
+            func: Performs the upstream call
+            ttl: Seconds to cache the result for (0 disables caching)
+            priority: Priority class used by the rate limiter
+            cacheable: Optional predicate; results failing it are not cached
+
+        Raises:
+            RateLimitExceeded: If no token became available in time
+        """
+        if ttl > 0:
+            hit, value = self.cache.get(key)
+            if hit:
+                return value
+
+        def run():
+            if not self.limiter.acquire(priority, self.acquire_timeout):
+                raise RateLimitExceeded(f"Upstream rate limit reached for {priority} request")
+            value = func()
+            if cacheable is None or cacheable(value):
+                self.cache.set(key, value, ttl)
+            return value
+
+        return self.coalescer.call(key, run)
+
+    def get_status(self) -> Dict:
+        return {
+            'rate_limiter': self.limiter.get_status(),
+            'coalescing': self.coalescer.get_status(),
+            'response_cache': self.cache.get_status()
+        }
@@ -28,6 +28,20 @@ except ImportError:
         def get_api_status(self):
             return {'connectivity': 'SIMULATED'}
 
+from qld_fuel_price_history import PriceHistoryIndex, epoch_seconds, naive_utc
+from qld_fuel_price_cycles import PriceCycleAnalysis
+from qld_fuel_cheapest import CheapestStationIndex
+from qld_fuel_live_snapshot import LiveSnapshot
+from qld_fuel_regions import RegionRollups
+from qld_fuel_search import KINDS as SEARCH_KINDS, SearchIndex
+from qld_fuel_filters import FilterIndex
+from qld_fuel_alerts import FEED_LIVE, FEED_REPLAY, AlertEngine, AlertSubscription, FileAlertSink, LoggingAlertSink
+from qld_fuel_dataset import FuelPriceDataset
+from qld_fuel_partitions import MonthPartitionStore
+from qld_fuel_rendered import PrerenderedResponses
+from qld_fuel_memory import MemoryTracker, deep_sizeof, live_dataframes
+from qld_fuel_formats import BINARY_FORMATS, available_formats, frame_response, negotiate_format
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -35,43 +49,215 @@ app = Flask(__name__)
 CORS(app)
 
 fuel_data_cache = {}
+fuel_data_frame = None
 last_update_time = None
 api_client = None
+live_snapshot = None
+region_rollups = None
+alert_engine = None
+# Latest historical change already evaluated for alerts
+alert_watermark = None
+# Whether the live snapshot's first board has seeded the live alert state
+live_alerts_seeded = False
+price_history = None
+# Epoch seconds from which price_history and filter_index hold every change
+hot_window_start = None
+price_cycles = None
+cheapest_index = None
+search_index = None
+filter_index = None
+# /api/data variants encoded once per generation
+rendered_responses = None
+# Month partitions of the on-disk dataset (only when QLD_FUEL_DATASET_DIR is set)
+month_store = None
+# Peak memory per refresh; tracemalloc diffs when QLD_FUEL_TRACEMALLOC is set
+memory_tracker = MemoryTracker()
+
+# Upper bounds for POST /api/cheapest/batch
+MAX_BATCH_QUERIES = 500
+MAX_BATCH_LIMIT = 100
 
 def initialize_api():
-    global api_client
-    api_client = QLDFuelPriceAPI()
+    global api_client, live_snapshot, region_rollups, alert_engine, live_alerts_seeded
+    # Point at a local stand-in (see qld_fuel_fake_upstream.py) for offline runs
+    base_url = os.environ.get('QLD_FUEL_API_BASE_URL')
+    historical_data_url = os.environ.get('QLD_FUEL_HISTORICAL_DATA_URL')
+    if base_url or historical_data_url:
+        api_client = QLDFuelPriceAPI(base_url=base_url, historical_data_url=historical_data_url)
+    else:
+        api_client = QLDFuelPriceAPI()
+    live_snapshot = LiveSnapshot(api_client)
+    region_rollups = RegionRollups(live_snapshot)
+    live_snapshot.listeners.append(region_rollups.apply)
+    
+    alert_log = os.environ.get('QLD_FUEL_ALERT_LOG')
+    alert_engine = AlertEngine(FileAlertSink(alert_log) if alert_log else LoggingAlertSink())
+    live_alerts_seeded = False
+    live_snapshot.listeners.append(evaluate_live_changes)
+    
+    tracemalloc_frames = os.environ.get('QLD_FUEL_TRACEMALLOC')
+    if tracemalloc_frames:
+        memory_tracker.start_tracing(int(tracemalloc_frames))
     logger.info("API client initialized")
 
+def evaluate_live_changes(changed):
+    """Live snapshot listener; the first join reports the whole board, so it only seeds alert state"""
+    global live_alerts_seeded
+    
+    if live_alerts_seeded:
+        alert_engine.evaluate(changed, feed=FEED_LIVE)
+    else:
+        alert_engine.seed(changed, feed=FEED_LIVE)
+        live_alerts_seeded = True
+
+def alert_records(changes):
+    """Historical change rows shaped like live snapshot rows for the alert engine"""
+    changes = changes[['site_id', 'site_name', 'fuel_type', 'suburb', 'latitude', 'longitude',
+                       'price_dollars', 'transaction_date']]
+    changes = changes.rename(columns={'price_dollars': 'price', 'transaction_date': 'last_updated'})
+    changes['last_updated'] = changes['last_updated'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return changes.to_dict('records')
+
+def evaluate_new_changes(historical_data):
+    """Run alerts over historical changes newer than the last evaluated one"""
+    global alert_watermark
+    
+    valid = historical_data.dropna(subset=['transaction_date'])
+    if valid.empty or alert_engine is None:
+        return
+    latest = valid['transaction_date'].max()
+    
+    # Alerts are best-effort; a bad row must never abort the cache refresh
+    try:
+        if alert_watermark is None:
+            # The first load sets the watermark and seeds the latest price per station,
+            # so that old history does not fire alerts
+            latest_prices = valid.sort_values('transaction_date').drop_duplicates(['site_id', 'fuel_type'], keep='last')
+            alert_engine.seed(alert_records(latest_prices), feed=FEED_REPLAY)
+        else:
+            new_changes = valid[valid['transaction_date'] > alert_watermark].sort_values('transaction_date')
+            if not new_changes.empty:
+                alert_engine.evaluate(alert_records(new_changes), feed=FEED_REPLAY)
+    except Exception as e:
+        logger.error(f"Alert evaluation failed: {e}")
+    
+    alert_watermark = latest
+
+def load_historical_data():
+    """Hot months from the partitioned dataset when configured, otherwise a download"""
+    global month_store
+    
+    dataset_dir = os.environ.get('QLD_FUEL_DATASET_DIR')
+    if dataset_dir:
+        if month_store is None:
+            month_store = MonthPartitionStore(
+                FuelPriceDataset(dataset_dir),
+                budget_bytes=int(float(os.environ.get('QLD_FUEL_MEMORY_BUDGET_MB', 512)) * 2**20),
+                hot_months=int(os.environ.get('QLD_FUEL_HISTORY_MONTHS', 1))
+            )
+        months = month_store.refresh_months()
+        if months:
+            logger.info(f"Loading {min(month_store.hot_months, len(months))} hot month(s) from {dataset_dir}")
+            return month_store.hot_frame()
+        logger.warning(f"No completed months in {dataset_dir}, downloading instead")
+    return api_client.download_historical_data(2025, 1)
+
+def history_for(at):
+    """As-of index covering ``at``, loading older month partitions when needed"""
+    seconds = epoch_seconds(at)
+    if month_store is None or (hot_window_start is not None and seconds >= hot_window_start):
+        return price_history
+    
+    # Changes-only data: the previous month seeds prices that did not change during the month of ``at``
+    window_start = (pd.Timestamp(seconds, unit='s').to_period('M') - 1).start_time
+    history = month_store.query(window_start, at)
+    return PriceHistoryIndex(history) if not history.empty else price_history
+
+def hot_history(historical_data):
+    """
+    Frame for the hot PriceHistoryIndex, and the instant its boards are complete from
+
+    The dataset stores changes only, so series that last changed before the hot
+    months are carried in from the month before them; without that, boards early
+    in the hot window would miss every station whose price held steady.
+    """
+    start = month_store.hot_start() if month_store is not None else None
+    if start is None:
+        return historical_data, None
+    carried = month_store.carried_prices()
+    if not carried.empty:
+        historical_data = pd.concat([historical_data, carried], ignore_index=True)
+    return historical_data, epoch_seconds(start)
+
+def query_filters(args):
+    """
+    FilterIndex.select arguments from query parameters
+    
+    fuel_type, brand, suburb and postcode may repeat (matched with OR);
+    start/end are timestamps and min_price/max_price dollars.
+    """
+    filters = {name: args.getlist(name) or None for name in ('fuel_type', 'brand', 'suburb', 'postcode')}
+    # Stored transaction dates are naive UTC
+    for name in ('start', 'end'):
+        value = args.get(name)
+        filters[name] = naive_utc(value) if value else None
+    for name in ('min_price', 'max_price'):
+        value = args.get(name)
+        filters[name] = float(value) if value else None
+    return filters
+
+def frame_records(df):
+    """Convert a historical frame to JSON-serializable records, handling NaT values"""
+    records = []
+    for _, row in df.iterrows():
+        record = row.to_dict()
+        
+        # Handle NaT values in transaction_date
+        if pd.isna(record.get('transaction_date')):
+            record['transaction_date'] = None
+        else:
+            record['transaction_date'] = record['transaction_date'].isoformat()
+        
+        # Handle NaT values in date
+        if pd.isna(record.get('date')):
+            record['date'] = None
+        else:
+            record['date'] = record['date'].isoformat()
+        
+        records.append(record)
+    return records
+
+def render_responses(cache, historical_data, filters):
+    """Encode the full payload, the summary and every per-fuel slice of /api/data"""
+    # Same bytes jsonify would produce
+    rendered = PrerenderedResponses(lambda payload: app.json.response(payload).get_data())
+    rendered.add('data', cache)
+    rendered.add('summary', {key: value for key, value in cache.items() if key != 'historical_data'})
+    
+    records = cache['historical_data']
+    for fuel_type in cache['fuel_types']:
+        rows = filters.select(fuel_type=fuel_type)
+        rendered.add(f'fuel:{fuel_type}', {
+            **cache,
+            'historical_data': [records[row] for row in rows],
+            'summary_stats': api_client.analyze_price_trends(historical_data.iloc[rows])
+        })
+    
+    logger.info(f"Rendered {len(rendered.variants)} response variants in {rendered.elapsed * 1000:.0f} ms")
+    return rendered
+
+@memory_tracker.tracked
 def update_data_cache():
-    global fuel_data_cache, last_update_time
+    global fuel_data_cache, fuel_data_frame, last_update_time, price_history, price_cycles, cheapest_index, search_index
+    global rendered_responses, filter_index, hot_window_start
     
     try:
         logger.info("Updating data cache...")
-        historical_data = api_client.download_historical_data(2025, 1)
+        historical_data = load_historical_data()
         
         if not historical_data.empty:
-            # Convert to JSON-serializable format, handling NaT values
-            historical_records = []
-            for _, row in historical_data.iterrows():
-                record = row.to_dict()
-                
-                # Handle NaT values in transaction_date
-                if pd.isna(record.get('transaction_date')):
-                    record['transaction_date'] = None
-                else:
-                    record['transaction_date'] = record['transaction_date'].isoformat()
-                
-                # Handle NaT values in date
-                if pd.isna(record.get('date')):
-                    record['date'] = None
-                else:
-                    record['date'] = record['date'].isoformat()
-                
-                historical_records.append(record)
-            
             fuel_data_cache = {
-                'historical_data': historical_records,
+                'historical_data': frame_records(historical_data),
                 'summary_stats': api_client.analyze_price_trends(historical_data),
                 'fuel_types': historical_data['fuel_type'].unique().tolist(),
                 'suburbs': historical_data['suburb'].unique().tolist(),
@@ -79,6 +265,17 @@ def update_data_cache():
                 'last_updated': datetime.now().isoformat()
             }
             
+            fuel_data_frame = historical_data
+            filter_index = FilterIndex(historical_data)
+            rendered_responses = render_responses(fuel_data_cache, historical_data, filter_index)
+            history_data, window_start = hot_history(historical_data)
+            price_history = PriceHistoryIndex(history_data)
+            hot_window_start = window_start if window_start is not None else price_history.base_time
+            price_cycles = PriceCycleAnalysis(price_history)
+            cheapest_index = CheapestStationIndex(price_history)
+            search_index = SearchIndex(historical_data)
+            evaluate_new_changes(historical_data)
+            
             last_update_time = datetime.now()
             logger.info(f"Data cache updated with {len(historical_data)} records")
         else:
@@ -99,6 +296,10 @@ def api_status():
         status = api_client.get_api_status()
         status['cache_last_updated'] = last_update_time.isoformat() if last_update_time else None
         status['cached_records'] = len(fuel_data_cache.get('historical_data', []))
+        status['partitions'] = month_store.get_status() if month_store is not None else None
+        status['regions'] = region_rollups.get_status() if region_rollups is not None else None
+        status['filter_index'] = filter_index.get_status() if filter_index is not None else None
+        status['rendered_responses'] = rendered_responses.get_status() if rendered_responses is not None else None
         return jsonify(status)
     except Exception as e:
         logger.error(f"Error getting API status: {e}")
@@ -112,6 +313,29 @@ def get_fuel_data():
             datetime.now() - last_update_time > timedelta(hours=1)):
             update_data_cache()
         
+        # Binary formats carry the historical records only, straight from the frame,
+        # so the summary view (which has no records) is JSON only
+        summary = request.args.get('view') == 'summary'
+        allowed = ['json'] if summary else ['json'] + [f for f in available_formats() if f in BINARY_FORMATS]
+        fmt = negotiate_format(request, allowed)
+        if fmt is None:
+            return jsonify({'error': f"Unsupported format. Use one of: {', '.join(allowed)}"}), 406
+        fuel_type = request.args.get('fuel_type')
+        if fmt in BINARY_FORMATS and fuel_data_frame is not None:
+            df = filter_index.frame(fuel_type=fuel_type) if fuel_type else fuel_data_frame
+            return frame_response(df, fmt)
+        
+        # Pre-encoded bytes for this generation: full payload, summary or one fuel type
+        variant = 'summary' if summary else f'fuel:{fuel_type}' if fuel_type else 'data'
+        if rendered_responses is not None:
+            response = rendered_responses.respond(request, variant)
+            if response is not None:
+                return response
+            if fuel_type:
+                return jsonify({'error': f'No data for fuel type {fuel_type}'}), 404
+        
+        if summary:
+            return jsonify({key: value for key, value in fuel_data_cache.items() if key != 'historical_data'})
         return jsonify(fuel_data_cache)
     except Exception as e:
         logger.error(f"Error getting fuel data: {e}")
@@ -124,84 +348,410 @@ def get_cheapest_stations():
         suburb = request.args.get('suburb')
         limit = int(request.args.get('limit', 10))
         
-        if not fuel_data_cache.get('historical_data'):
+        if cheapest_index is None:
             return jsonify({'error': 'No data available'}), 404
         
-        df = pd.DataFrame(fuel_data_cache['historical_data'])
-        df['price_dollars'] = pd.to_numeric(df['price_dollars'], errors='coerce')
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
-        
-        cheapest = api_client.find_cheapest_stations(df, fuel_type, suburb, limit)
+        cheapest = cheapest_index.find_cheapest(fuel_type, suburb, limit)
         
         return jsonify(cheapest)
     except Exception as e:
         logger.error(f"Error getting cheapest stations: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cheapest/batch', methods=['POST'])
+def get_cheapest_stations_batch():
+    """Answer many cheapest-station lookups in one request"""
+    try:
+        if cheapest_index is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        body = request.get_json(silent=True)
+        queries = body.get('queries') if isinstance(body, dict) else body
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'Expected a JSON list of queries or {"queries": [...]}'}), 400
+        if len(queries) > MAX_BATCH_QUERIES:
+            return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch'}), 400
+        
+        parsed = []
+        for i, query in enumerate(queries):
+            if not isinstance(query, dict):
+                return jsonify({'error': f'Query {i} must be an object'}), 400
+            try:
+                limit = min(int(query.get('limit', 10)), MAX_BATCH_LIMIT)
+            except (TypeError, ValueError):
+                return jsonify({'error': f'Query {i} has an invalid limit'}), 400
+            fuel_type = query.get('fuel_type', 'Unleaded')
+            if not isinstance(fuel_type, str):
+                return jsonify({'error': f'Query {i} has an invalid fuel_type'}), 400
+            suburb = query.get('suburb')
+            if suburb is not None and not isinstance(suburb, str):
+                return jsonify({'error': f'Query {i} has an invalid suburb'}), 400
+            parsed.append((fuel_type, suburb or None, limit))
+        
+        stations = cheapest_index.find_cheapest_batch(parsed)
+        
+        return jsonify({
+            'count': len(parsed),
+            'results': [
+                {'fuel_type': fuel_type, 'suburb': suburb, 'limit': limit, 'stations': found}
+                for (fuel_type, suburb, limit), found in zip(parsed, stations)
+            ]
+        })
+    except Exception as e:
+        logger.error(f"Error getting cheapest stations batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/rank')
+def get_station_rank():
+    """How a station's latest price compares with the state or its suburb"""
+    try:
+        if cheapest_index is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        site_id = request.args.get('site_id', type=int)
+        fuel_type = request.args.get('fuel_type', 'Unleaded')
+        scope = request.args.get('scope', 'state')
+        
+        if site_id is None:
+            return jsonify({'error': 'site_id is required'}), 400
+        if scope not in ('state', 'suburb'):
+            return jsonify({'error': 'Unsupported scope. Use state or suburb.'}), 400
+        
+        rank = cheapest_index.rank(site_id, fuel_type, within_suburb=scope == 'suburb')
+        if rank is None:
+            return jsonify({'error': f'No {fuel_type} price for site {site_id}'}), 404
+        
+        return jsonify(rank)
+    except Exception as e:
+        logger.error(f"Error getting station rank: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/percentile')
+def get_price_percentile():
+    """Latest price at a percentile, statewide or within a suburb"""
+    try:
+        if cheapest_index is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        fuel_type = request.args.get('fuel_type', 'Unleaded')
+        suburb = request.args.get('suburb')
+        try:
+            percentile = float(request.args.get('p', 50))
+        except ValueError:
+            percentile = None
+        # The comparison also rejects nan and inf
+        if percentile is None or not 0 <= percentile <= 100:
+            return jsonify({'error': 'p must be a number from 0 to 100'}), 400
+        
+        result = cheapest_index.price_at_percentile(fuel_type, percentile, suburb)
+        if result is None:
+            return jsonify({'error': 'No prices for the specified filters'}), 404
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error getting price percentile: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/prices')
+def get_prices_at():
+    """Reconstruct the statewide price board as of a given instant"""
+    try:
+        if price_history is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        at = request.args.get('at')
+        fuel_type = request.args.get('fuel_type')
+        suburb = request.args.get('suburb')
+        layout = request.args.get('layout', 'columns')
+        if layout not in ('columns', 'records'):
+            return jsonify({'error': f'Unknown layout: {layout}'}), 400
+        
+        try:
+            at = pd.Timestamp(at) if at else pd.Timestamp.now(tz='UTC')
+        except ValueError:
+            return jsonify({'error': f'Invalid timestamp: {at}'}), 400
+        
+        history = history_for(at)
+        # Columns by default: one list per field encodes far faster than a dict per station
+        if layout == 'records':
+            prices = history.prices_at(at, fuel_type, suburb)
+            count = len(prices)
+        else:
+            prices = history.board_at(at, fuel_type, suburb)
+            count = len(prices['price'])
+        
+        return jsonify({
+            'at': at.isoformat(),
+            'coverage': history.get_coverage(),
+            'layout': layout,
+            'count': count,
+            'prices': prices
+        })
+    except Exception as e:
+        logger.error(f"Error getting prices: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cycles')
+def get_price_cycles():
+    """Retail price-cycle phase per suburb, brand or station"""
+    try:
+        if price_cycles is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        group_by = request.args.get('group_by', 'suburb')
+        fuel_type = request.args.get('fuel_type')
+        suburb = request.args.get('suburb')
+        
+        if group_by == 'station':
+            results = price_cycles.station_phases(fuel_type, suburb)
+        elif group_by in ('suburb', 'brand'):
+            results = price_cycles.summarize(group_by, fuel_type)
+        else:
+            return jsonify({'error': 'Unsupported group_by. Use suburb, brand or station.'}), 400
+        
+        return jsonify({
+            'group_by': group_by,
+            'restoration_threshold': price_cycles.restoration_threshold,
+            'analysis_ms': round(price_cycles.elapsed * 1000, 1),
+            'results': results
+        })
+    except Exception as e:
+        logger.error(f"Error getting price cycles: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search')
+def search():
+    """Ranked autocomplete over suburbs, postcodes, stations and brands"""
+    try:
+        if search_index is None:
+            return jsonify({'error': 'No data available'}), 404
+        
+        query = request.args.get('q', '')
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        kinds = [kind for kind in request.args.get('kind', '').split(',') if kind]
+        
+        unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+        if unknown:
+            return jsonify({'error': f"Unsupported kind. Use any of: {', '.join(SEARCH_KINDS)}"}), 400
+        
+        started = time.perf_counter()
+        results = search_index.search(query, limit, kinds)
+        
+        return jsonify({
+            'query': query,
+            'results': results,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+    except Exception as e:
+        logger.error(f"Error searching: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/alerts', methods=['GET', 'POST'])
+def price_alerts():
+    """List or create price-alert subscriptions"""
+    try:
+        if request.method == 'GET':
+            return jsonify({
+                'status': alert_engine.get_status(),
+                'subscriptions': alert_engine.list_subscriptions()
+            })
+        
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        
+        try:
+            subscription = AlertSubscription(
+                fuel_type=body.get('fuel_type'),
+                threshold=float(body['threshold']) if body.get('threshold') is not None else None,
+                suburb=body.get('suburb'),
+                latitude=float(body['latitude']) if body.get('latitude') is not None else None,
+                longitude=float(body['longitude']) if body.get('longitude') is not None else None,
+                radius_km=float(body['radius_km']) if body.get('radius_km') is not None else None,
+                subscriber=body.get('subscriber')
+            )
+            subscription = alert_engine.subscribe(subscription)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'subscription_id': subscription.subscription_id}), 201
+    except Exception as e:
+        logger.error(f"Error handling price alerts: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/alerts/<int:subscription_id>', methods=['DELETE'])
+def delete_price_alert(subscription_id):
+    try:
+        if not alert_engine.unsubscribe(subscription_id):
+            return jsonify({'error': f'No subscription {subscription_id}'}), 404
+        return jsonify({'deleted': subscription_id})
+    except Exception as e:
+        logger.error(f"Error deleting price alert: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/alerts/triggered')
+def triggered_price_alerts():
+    """Most recently triggered alerts, newest first"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        return jsonify(alert_engine.get_recent(limit))
+    except Exception as e:
+        logger.error(f"Error getting triggered alerts: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/live')
 def get_live_data():
-    """Get live data from the API with correct parameters"""
+    """Live prices joined with site details, served from the in-memory snapshot"""
+    try:
+        # Under WSGI or the test client nothing calls start(), so stale tiers refresh here
+        live_snapshot.ensure_fresh()
+        
+        fuel_type = request.args.get('fuel_type')
+        suburb = request.args.get('suburb')
+        site_id = request.args.get('site_id', type=int)
+        limit = request.args.get('limit', type=int)
+        
+        rows = live_snapshot.get_rows(fuel_type, suburb, site_id, limit)
+        snapshot_status = live_snapshot.get_status()
+        
+        return jsonify({
+            'live_prices': rows,
+            'fuel_types': snapshot_status.pop('fuel_types'),
+            'brands': snapshot_status.pop('brands'),
+            'summary': {
+                'timestamp': datetime.now().isoformat(),
+                'api_version': api_client.health.api_version or 'Unknown',
+                'count': len(rows),
+                'snapshot': snapshot_status
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error getting live data: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def current_region_rollups():
+    """Region rollups in step with the live snapshot"""
+    live_snapshot.ensure_fresh()
+    if region_rollups.metadata_version != live_snapshot.metadata_version:
+        region_rollups.apply()
+    return region_rollups
+
+@app.route('/api/regions/<int:level>')
+def get_region_level(level):
+    """Every region at a hierarchy level for one fuel, e.g. Brisbane versus the regions"""
     try:
-        # Update API client methods to use correct parameters
-        live_data = {}
+        rollups = current_region_rollups()
+        fuel_type = request.args.get('fuel_type', 'Unleaded')
         
-        # Test live API endpoints with corrected parameters
-        import requests
-        token = api_client.api_token
-        base_url = api_client.base_url
-        headers = api_client.headers
+        regions = rollups.get_level(level, fuel_type)
         
-        # Get fuel types
-        response = requests.get(f"{base_url}/Subscriber/GetCountryFuelTypes?countryId=21", headers=headers, timeout=10)
-        if response.status_code == 200:
-            live_data['fuel_types'] = response.json()
+        return jsonify({
+            'level': level,
+            'fuel_type': fuel_type,
+            'count': len(regions),
+            'regions': regions
+        })
+    except Exception as e:
+        logger.error(f"Error getting region level: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/regions/<int:level>/<int:region_id>')
+def get_region(level, region_id):
+    """Precomputed price statistics and cheapest stations for one region"""
+    try:
+        rollups = current_region_rollups()
+        fuel_type = request.args.get('fuel_type')
+        limit = min(request.args.get('limit', rollups.cheapest, type=int), 100)
         
-        # Get brands
-        response = requests.get(f"{base_url}/Subscriber/GetCountryBrands?countryId=21", headers=headers, timeout=10)
-        if response.status_code == 200:
-            live_data['brands'] = response.json()
+        region = rollups.get_region(level, region_id, fuel_type, limit)
+        if region is None:
+            return jsonify({'error': f'No level {level} region {region_id}'}), 404
         
-        # Get live prices (sample region)
-        response = requests.get(f"{base_url}/Price/GetSitesPrices?countryId=21&geoRegionLevel=3&geoRegionId=1", headers=headers, timeout=10)
-        if response.status_code == 200:
-            live_data['live_prices'] = response.json()
+        return jsonify(region)
+    except Exception as e:
+        logger.error(f"Error getting region: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def cached_structures():
+    """Every long-lived structure the dashboard holds, by name"""
+    return {
+        'records': fuel_data_cache.get('historical_data'),
+        'summary_stats': fuel_data_cache.get('summary_stats'),
+        'historical_frame': fuel_data_frame,
+        'price_history': price_history,
+        'price_cycles': price_cycles,
+        'cheapest_index': cheapest_index,
+        'search_index': search_index,
+        'filter_index': filter_index,
+        'rendered_responses': rendered_responses,
+        'month_partitions': month_store,
+        'live_snapshot': live_snapshot,
+        'region_rollups': region_rollups,
+        'alert_engine': alert_engine,
+        'api_client': api_client
+    }
+
+@app.route('/api/debug/memory')
+def debug_memory():
+    """Bytes held by each cached structure, refresh memory peaks and tracemalloc diffs"""
+    try:
+        top = min(request.args.get('top', 10, type=int), 100)
+        started = time.perf_counter()
         
-        # Add summary
-        live_data['summary'] = {
-            'timestamp': datetime.now().isoformat(),
-            'api_version': api_client.get_api_version(),
-            'status': 'Working with corrected parameters from Postman collection'
-        }
+        # Size each structure without counting what it shares with the others
+        structures = cached_structures()
+        sizes = {}
+        for name, structure in structures.items():
+            others = [other for other_name, other in structures.items()
+                      if other_name != name and other is not None]
+            sizes[name] = round(deep_sizeof(structure, exclude=others) / 2**20, 2) if structure is not None else None
         
-        return jsonify(live_data)
+        return jsonify({
+            'process': memory_tracker.get_status(),
+            'structures_mb': sizes,
+            'structures_total_mb': round(sum(size for size in sizes.values() if size), 2),
+            'live_dataframes': live_dataframes(),
+            'tracemalloc': memory_tracker.top_differences(top),
+            'took_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
     except Exception as e:
-        logger.error(f"Error getting live data: {e}")
+        logger.error(f"Error getting memory usage: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export')
 def export_data():
     """Export data in various formats"""
     try:
-        format_type = request.args.get('format', 'json')
-        fuel_type = request.args.get('fuel_type')
-        suburb = request.args.get('suburb')
+        format_type = negotiate_format(request, available_formats())
         
         if not fuel_data_cache.get('historical_data'):
             return jsonify({'error': 'No data available'}), 404
         
-        # Filter data if requested
-        data = fuel_data_cache['historical_data'].copy()
+        try:
+            filters = query_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid filter: {e}'}), 400
         
-        if fuel_type:
-            data = [record for record in data if record.get('fuel_type') == fuel_type]
-        
-        if suburb:
-            data = [record for record in data if record.get('suburb') == suburb]
+        # With no hot history any date range has to come from the partitions
+        reaches_back = month_store is not None and any(
+            filters[name] is not None and (hot_window_start is None or epoch_seconds(filters[name]) < hot_window_start)
+            for name in ('start', 'end'))
+        if reaches_back:
+            # Ranges reaching before the hot months load those partitions (and their indexes) on demand
+            df = month_store.select(**filters)
+            if format_type in BINARY_FORMATS:
+                return frame_response(df, format_type, filename='fuel-prices')
+            data = frame_records(df)
+        else:
+            rows = filter_index.select(**filters)
+            if format_type in BINARY_FORMATS:
+                return frame_response(fuel_data_frame.iloc[rows], format_type, filename='fuel-prices')
+            records = fuel_data_cache['historical_data']
+            data = [records[row] for row in rows]
         
         if format_type == 'json':
             return jsonify(data)
         elif format_type == 'csv':
-            import pandas as pd
             df = pd.DataFrame(data)
             csv_data = df.to_csv(index=False)
             
@@ -213,7 +763,7 @@ def export_data():
                 headers={'Content-Disposition': 'attachment; filename=fuel-prices.csv'}
             )
         else:
-            return jsonify({'error': 'Unsupported format. Use json or csv.'}), 400
+            return jsonify({'error': f"Unsupported format. Use one of: {', '.join(available_formats())}"}), 400
             
     except Exception as e:
         logger.error(f"Error exporting data: {e}")
@@ -227,6 +777,8 @@ if __name__ == "__main__":
     
     initialize_api()
     update_data_cache()
+    live_snapshot.start()
+    api_client.health.start()
     
     logger.info("Starting Queensland Fuel Price Dashboard...")
     logger.info("Open your browser to: http://localhost:5008")
@@ -63,7 +63,10 @@ pip install --upgrade pip
 
 # Install required packages
 print_status "Installing required Python packages..."
-pip install flask flask-cors pandas requests beautifulsoup4 lxml openpyxl
+pip install flask flask-cors pandas requests beautifulsoup4 lxml openpyxl brotli
+
+# Optional: Arrow/Parquet/MessagePack responses from /api/data and /api/export
+pip install pyarrow msgpack || print_warning "pyarrow/msgpack not installed - binary export formats disabled"
 
 # Create requirements.txt
 cat > requirements.txt << EOF
@@ -74,6 +77,7 @@ requests==2.31.0
 beautifulsoup4==4.12.2
 lxml==4.9.3
 openpyxl==3.1.2
+brotli==1.1.0
 EOF
 
 print_status "Requirements file created"
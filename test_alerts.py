@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed price-alert engine
+"""
+
+import pytest
+
+from qld_fuel_alerts import FEED_LIVE, FEED_REPLAY, AlertEngine, AlertSink, AlertSubscription, QueueAlertSink
+
+NAN = float('nan')
+
+
+@pytest.fixture
+def engine():
+    return AlertEngine(QueueAlertSink())
+
+
+def change(price, site_id=1, suburb='Southport', latitude=-27.97, longitude=153.41, fuel_type='Diesel'):
+    return {'site_id': site_id, 'fuel_type': fuel_type, 'price': price, 'suburb': suburb,
+            'latitude': latitude, 'longitude': longitude, 'site_name': 'Alpha Fuel'}
+
+
+def test_suburb_alert_fires_once_and_rearms(engine):
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+    assert len(engine.evaluate([change(1.79)])) == 1
+    assert engine.evaluate([change(1.75)]) == []
+    assert engine.evaluate([change(1.85)]) == []
+    assert len(engine.evaluate([change(1.70)])) == 1
+
+
+def test_radius_alert(engine):
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, latitude=-27.97,
+                                       longitude=153.41, radius_km=5))
+    assert len(engine.evaluate([change(1.70, suburb=None)])) == 1
+    # About 40 km away
+    assert engine.evaluate([change(1.70, site_id=2, latitude=-27.60)]) == []
+
+
+def test_missing_coordinates_do_not_raise(engine):
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, latitude=-27.97,
+                                       longitude=153.41, radius_km=5))
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+    alerts = engine.evaluate([change(1.70, latitude=NAN, longitude=NAN), change(1.70, site_id=2, latitude=None),
+                              change(NAN, site_id=3)])
+    # Only the suburb subscription can match a station without coordinates
+    assert [alert['site_id'] for alert in alerts] == [1, 2]
+
+
+@pytest.mark.parametrize('fields', [
+    {'threshold': NAN, 'suburb': 'Southport'},
+    {'threshold': 1.80, 'latitude': NAN, 'longitude': 153.41, 'radius_km': 5},
+    {'threshold': 1.80, 'latitude': -27.97, 'longitude': 153.41, 'radius_km': float('inf')},
+    {'threshold': 1.80, 'suburb': ['Southport']},
+    {'threshold': 1.80, 'suburb': 'Southport', 'fuel_type': ['Diesel']},
+])
+def test_invalid_subscription_leaves_nothing_behind(engine, fields):
+    with pytest.raises(ValueError):
+        engine.subscribe(AlertSubscription(**{'fuel_type': 'Diesel', **fields}))
+    assert engine.subscriptions == {}
+    assert not any(bucket.ids for bucket in engine.suburb_buckets.values())
+    assert not any(bucket.ids for bucket in engine.cell_buckets.values())
+    assert engine.evaluate([change(1.50)]) == []
+
+
+def test_unsubscribe(engine):
+    subscription = engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+    assert engine.unsubscribe(subscription.subscription_id)
+    assert not engine.unsubscribe(subscription.subscription_id)
+    assert engine.evaluate([change(1.70)]) == []
+
+
+def test_sinks_must_implement_emit():
+    class Incomplete(AlertSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_seed_marks_satisfied_alerts_without_emitting(engine):
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+
+    engine.seed([change(1.70), change(1.90, site_id=2)])
+    assert engine.sink.queue.empty()
+    assert engine.get_status()['alerts_emitted'] == 0
+
+    # Station 1 was already below the threshold; station 2 is a new dip
+    assert engine.evaluate([change(1.69)]) == []
+    assert [alert['site_id'] for alert in engine.evaluate([change(1.75, site_id=2)])] == [2]
+    # Seeded alerts re-arm like any other
+    assert engine.evaluate([change(1.85)]) == []
+    assert len(engine.evaluate([change(1.70)])) == 1
+
+
+def test_live_and_replay_feeds_keep_separate_state(engine):
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+
+    assert len(engine.evaluate([change(1.70)], feed=FEED_REPLAY)) == 1
+    # The replayed dip neither suppresses nor re-arms the live feed
+    assert len(engine.evaluate([change(1.70)], feed=FEED_LIVE)) == 1
+    assert engine.evaluate([change(1.90)], feed=FEED_LIVE) == []
+    assert engine.evaluate([change(1.65)], feed=FEED_REPLAY) == []
+    assert engine.get_status()['active_alerts'] == 1
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the cheapest-station index
+"""
+
+import pytest
+
+from qld_fuel_cheapest import CheapestStationIndex
+from qld_fuel_price_history import PriceHistoryIndex
+
+
+@pytest.fixture
+def make_index(make_changes):
+    def build(changes, sites=None):
+        return CheapestStationIndex(PriceHistoryIndex(make_changes(changes, sites)))
+    return build
+
+
+@pytest.fixture
+def index(make_index):
+    return make_index([
+        (1, 'Diesel', '2025-01-01', 1.95),
+        (1, 'Diesel', '2025-01-02', 1.90),
+        (2, 'Diesel', '2025-01-01', 1.90),
+        (3, 'Diesel', '2025-01-01', 1.80),
+        (3, 'Unleaded', '2025-01-01', 1.70),
+    ])
+
+
+def test_rank_statewide_uses_latest_price_and_counts_ties(index):
+    rank = index.rank(1, 'Diesel')
+    assert (rank['rank'], rank['tied'], rank['stations'], rank['scope']) == (2, 2, 3, 'state')
+    assert rank['percentile'] == 100.0 and rank['cheaper_than_pct'] == 0.0
+    assert index.rank(3, 'Diesel')['rank'] == 1
+
+
+def test_rank_within_suburb(index):
+    rank = index.rank(3, 'Diesel', within_suburb=True)
+    assert (rank['rank'], rank['stations'], rank['scope'], rank['suburb']) == (1, 1, 'suburb', 'Chermside')
+
+
+def test_rank_unknown_station_or_fuel(index):
+    assert index.rank(99, 'Diesel') is None
+    assert index.rank(2, 'Unleaded') is None
+
+
+def test_rank_without_suburb_falls_back_to_statewide(make_index):
+    index = make_index([(1, 'Diesel', '2025-01-01', 1.90), (2, 'Diesel', '2025-01-01', 1.80)],
+                       sites={1: {'site_name': 'No Suburb', 'site_brand': 'Shell', 'address': None,
+                                  'suburb': None, 'postcode': None, 'latitude': None, 'longitude': None}})
+    rank = index.rank(1, 'Diesel', within_suburb=True)
+    assert (rank['rank'], rank['stations'], rank['scope'], rank['suburb']) == (2, 2, 'state', None)
+
+
+def test_price_at_percentile(index):
+    assert index.price_at_percentile('Diesel', 50)['price'] == 1.90
+    assert index.price_at_percentile('Diesel', 0)['price'] == 1.80
+    assert index.price_at_percentile('Diesel', 100, suburb='Southport')['price'] == 1.90
+    assert index.price_at_percentile('Diesel', 50, suburb='Nowhere') is None
+
+
+def test_cheapest_by_suburb(index):
+    assert [row['site_id'] for row in index.find_cheapest('Diesel', 'Southport')] == [1, 2]
+    assert index.find_cheapest('Hydrogen') == []
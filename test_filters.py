@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the posting-list/bitset filter index
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qld_fuel_filters import FilterIndex
+
+
+@pytest.fixture
+def frame(make_changes):
+    return make_changes([
+        (site_id, fuel_type, f'2025-01-{day:02d} {hour:02d}:00:00', 1.70 + (site_id + day + hour) % 30 / 100)
+        for site_id in (1, 2, 3) for fuel_type in ('Diesel', 'Unleaded', 'e10')
+        for day in range(1, 11) for hour in (6, 18)
+    ])
+
+
+@pytest.fixture
+def index(frame):
+    return FilterIndex(frame)
+
+
+def mask_rows(frame, fuel_type=None, brand=None, suburb=None, postcode=None, start=None, end=None,
+              min_price=None, max_price=None):
+    mask = pd.Series(True, index=frame.index)
+    for column, values in (('fuel_type', fuel_type), ('site_brand', brand), ('suburb', suburb)):
+        if values is not None:
+            mask &= frame[column].isin(values)
+    if postcode is not None:
+        mask &= frame['postcode'].astype(str).isin(postcode)
+    if start is not None:
+        mask &= frame['transaction_date'] >= start
+    if end is not None:
+        mask &= frame['transaction_date'] <= end
+    if min_price is not None:
+        mask &= frame['price_dollars'] >= min_price
+    if max_price is not None:
+        mask &= frame['price_dollars'] <= max_price
+    return np.flatnonzero(mask.to_numpy())
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'fuel_type': ['Diesel']},
+    {'fuel_type': ['Diesel', 'e10'], 'suburb': ['Southport']},
+    {'brand': ['Ampol'], 'postcode': ['4032']},
+    {'start': pd.Timestamp('2025-01-03 12:00'), 'end': pd.Timestamp('2025-01-05 06:00')},
+    {'fuel_type': ['Unleaded'], 'min_price': 1.80, 'max_price': 1.90},
+    {'max_price': 1.72},
+])
+def test_select_matches_masks(frame, index, filters):
+    assert index.select(**filters).tolist() == mask_rows(frame, **filters).tolist()
+
+
+@pytest.mark.parametrize('filters', [
+    {'fuel_type': 'Bogus'},
+    {'suburb': ['Nowhere']},
+    {'fuel_type': ['Diesel'], 'brand': ['Nobody']},
+    {'postcode': ['9999']},
+    {'start': pd.Timestamp('2030-01-01')},
+    {'end': pd.Timestamp('2024-12-16'), 'suburb': ['Southport']},
+    {'start': pd.Timestamp('2025-01-05'), 'end': pd.Timestamp('2025-01-04')},
+    {'min_price': 9.0, 'max_price': 8.0},
+    {'fuel_type': [], 'max_price': 2.0},
+])
+def test_unknown_values_and_out_of_range_dates_select_nothing(index, filters):
+    rows = index.select(**filters)
+    assert rows.dtype == np.int64 and len(rows) == 0
+    assert index.frame(**filters).empty
+
+
+def test_empty_frame(frame):
+    index = FilterIndex(frame.iloc[0:0])
+    assert len(index.select(fuel_type='Diesel')) == 0
+    assert len(index.select()) == 0
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for the circuit breaker and the background health prober
+"""
+
+import threading
+import time
+
+import pytest
+
+from qld_fuel_health import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, HealthProber
+
+
+def expire(breaker):
+    """Move the open time back past the reset timeout"""
+    breaker.opened_at -= breaker.reset_timeout
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+
+def test_breaker_opens_after_consecutive_failures(breaker):
+    breaker.record_failure('down')
+    breaker.record_failure('down')
+    assert breaker.state == STATE_CLOSED and breaker.allow()
+
+    breaker.record_failure('down')
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED and breaker.consecutive_failures == 1
+
+
+def test_open_breaker_half_opens_after_reset_timeout_and_closes_on_success(breaker):
+    for _ in range(3):
+        breaker.record_failure('down')
+    expire(breaker)
+
+    assert breaker.allow()
+    assert breaker.state == STATE_HALF_OPEN
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED and breaker.consecutive_failures == 0
+    assert [(t['from'], t['to']) for t in breaker.get_status()['transitions']] == [
+        (STATE_CLOSED, STATE_OPEN), (STATE_OPEN, STATE_HALF_OPEN), (STATE_HALF_OPEN, STATE_CLOSED)]
+
+
+def test_failed_trial_call_reopens_the_breaker(breaker):
+    for _ in range(3):
+        breaker.record_failure('down')
+    expire(breaker)
+    assert breaker.allow()
+
+    breaker.record_failure('still down')
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+    assert breaker.get_status()['transitions'][-1]['reason'] == 'still down'
+
+
+class FakeProbe:
+    """Returns a version, raises, or hangs until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, timeout):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise ConnectionError(self.error)
+        return '1.2.3'
+
+
+@pytest.fixture
+def probe():
+    return FakeProbe()
+
+
+@pytest.fixture
+def prober(probe):
+    return HealthProber(probe, interval=3600, timeout=0.2, breaker=CircuitBreaker(failure_threshold=2))
+
+
+def test_status_is_unknown_until_the_first_probe(prober, probe):
+    status = prober.get_status()
+    assert status['connectivity'] == 'UNKNOWN' and status['api_version'] is None
+    assert probe.calls == 0
+
+
+def test_successful_probe_records_version_and_latency(prober):
+    status = prober.check()
+
+    assert status['connectivity'] == 'OK'
+    assert status['api_version'] == '1.2.3'
+    assert status['circuit'] == STATE_CLOSED
+    assert status['latency_ms']['last'] is not None
+    assert status['recent_probes'][0]['ok']
+
+
+def test_failing_probes_open_the_circuit_and_skip_the_upstream(prober, probe):
+    probe.error = 'connection refused'
+    prober.check()
+    status = prober.check()
+
+    assert status['connectivity'] == 'ERROR: connection refused'
+    assert status['circuit'] == STATE_OPEN
+    assert status['failures'] == 2
+
+    status = prober.check()
+    assert probe.calls == 2
+    assert status['skipped_open'] == 1
+
+    # After the reset timeout one trial probe goes through and closes the circuit
+    probe.error = None
+    expire(prober.breaker)
+    status = prober.check()
+    assert probe.calls == 3
+    assert status['circuit'] == STATE_CLOSED and status['connectivity'] == 'OK'
+
+
+def test_hung_probe_times_out_and_is_not_stacked(prober, probe):
+    probe.release.clear()
+    try:
+        status = prober.check()
+        assert status['last_error'] == 'timed out after 0.2s'
+        assert status['timeouts'] == 1
+
+        # The hung call still occupies the probe worker, so no second call is made
+        status = prober.check()
+        assert status['last_error'] == 'previous probe still running'
+        assert probe.calls == 1
+        assert status['circuit'] == STATE_OPEN
+    finally:
+        probe.release.set()
+
+
+def test_background_thread_probes_until_stopped(prober, probe):
+    prober.start()
+    try:
+        deadline = time.monotonic() + 5
+        while prober.get_status()['probes'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert prober.get_status()['connectivity'] == 'OK'
+    finally:
+        prober.stop()
+    assert probe.calls == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the tiered live snapshot
+"""
+
+import time
+
+import pytest
+
+from qld_fuel_live_snapshot import LiveSnapshot
+
+
+@pytest.fixture
+def snapshot(live_client):
+    snapshot = LiveSnapshot(live_client, metadata_ttl=3600, price_ttl=60)
+    snapshot.changes = []
+    snapshot.listeners.append(snapshot.changes.append)
+    snapshot.refresh()
+    return snapshot
+
+
+def test_first_refresh_joins_site_details_with_prices(snapshot):
+    rows = snapshot.get_rows('Unleaded')
+
+    assert [(row['site_id'], row['price']) for row in rows] == [(2, 1.859), (1, 1.899)]
+    assert rows[0]['suburb'] == 'Southport' and rows[0]['region'] == 'Gold Coast' and rows[0]['brand'] == 'Shell'
+    assert snapshot.metadata_version == 1
+    assert len(snapshot.changes) == 1 and len(snapshot.changes[0]) == 2
+
+
+def test_unchanged_payloads_skip_the_join(snapshot):
+    rows, board = snapshot.rows, snapshot.board
+
+    snapshot.refresh(force=True)
+
+    # Every tier was fetched again but the hashes matched
+    assert snapshot.api_client.calls == {'sites': 2, 'fuels': 2, 'brands': 2, 'regions': 2, 'prices': 2}
+    assert snapshot.stats['unchanged_payloads'] == 5
+    assert snapshot.stats['joins'] == 1
+    assert snapshot.metadata_version == 1
+    assert snapshot.rows is rows and snapshot.board is board
+    assert len(snapshot.changes) == 1
+
+
+def test_changed_prices_rejoin_and_report_only_changed_rows(snapshot):
+    snapshot.api_client.prices[0]['Price'] = 1799
+    snapshot.prices_refreshed -= snapshot.price_ttl
+
+    snapshot.refresh()
+
+    assert snapshot.stats['joins'] == 2
+    assert snapshot.api_client.calls['sites'] == 1
+    assert [(row['site_id'], row['price']) for row in snapshot.changes[-1]] == [(1, 1.799)]
+    assert [row['site_id'] for row in snapshot.get_rows('Unleaded')] == [1, 2]
+
+
+def test_ensure_fresh_refreshes_only_stale_tiers(snapshot):
+    snapshot.ensure_fresh()
+    assert snapshot.api_client.calls['prices'] == 1
+
+    snapshot.prices_refreshed -= snapshot.price_ttl
+    snapshot.ensure_fresh()
+    assert snapshot.api_client.calls['prices'] == 2
+    assert snapshot.api_client.calls['sites'] == 1
+
+
+def test_ensure_fresh_leaves_refreshing_to_the_background_thread(snapshot):
+    snapshot.prices_refreshed -= snapshot.price_ttl
+    snapshot.start(interval=3600)
+    try:
+        # The thread refreshes once on start, then sleeps for the interval
+        while snapshot.api_client.calls['prices'] < 2:
+            time.sleep(0.01)
+        snapshot.prices_refreshed -= snapshot.price_ttl
+        snapshot.ensure_fresh()
+        assert snapshot.api_client.calls['prices'] == 2
+    finally:
+        snapshot.stop()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the self-hosted load-test harness
+"""
+
+import pytest
+
+from qld_fuel_load_test import TRAFFIC_MIX, run_load, start_self_hosted, summarize
+
+pytest.importorskip('werkzeug')
+
+
+@pytest.fixture
+def dashboard(monkeypatch):
+    # start_self_hosted points the client at the fake upstream through the environment
+    for name in ('QLD_FUEL_API_BASE_URL', 'QLD_FUEL_HISTORICAL_DATA_URL'):
+        monkeypatch.setenv(name, '')
+    monkeypatch.delenv('QLD_FUEL_DATASET_DIR', raising=False)
+
+    base_url = start_self_hosted(sites=40)
+    import qld_fuel_web_app
+    yield base_url, qld_fuel_web_app
+    qld_fuel_web_app.live_snapshot.stop()
+    qld_fuel_web_app.api_client.health.stop()
+
+
+def test_self_hosted_stack_serves_the_traffic_mix(dashboard):
+    base_url, web_app = dashboard
+
+    # The harness must run the live refresher, as the dashboard does
+    assert web_app.live_snapshot._thread is not None and web_app.live_snapshot._thread.is_alive()
+
+    samples = run_load(base_url, concurrency=2, duration=1.0)
+    report = summarize(samples, 1.0)
+
+    assert report['overall']['requests'] > 0
+    assert report['overall']['errors'] == 0
+    assert set(report['endpoints']) <= {name for _, name, _ in TRAFFIC_MIX}
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for cache byte accounting
+"""
+
+import numpy as np
+
+import qld_fuel_memory
+from qld_fuel_memory import deep_sizeof
+
+
+def records(count):
+    return [{'site_id': i, 'site_name': f'Station {i}', 'price': 1.8 + i / 10000} for i in range(count)]
+
+
+def test_long_record_lists_are_estimated_from_a_sample(monkeypatch):
+    rows = records(5000)
+    exact = deep_sizeof(rows[:qld_fuel_memory.SAMPLE_MIN_LENGTH]) * 5
+
+    calls = []
+    walk = qld_fuel_memory._deep_sizeof
+    monkeypatch.setattr(qld_fuel_memory, '_deep_sizeof', lambda obj, seen: calls.append(obj) or walk(obj, seen))
+    estimate = deep_sizeof(rows)
+
+    assert abs(estimate - exact) / exact < 0.05
+    # The top-level walk plus one per sampled record, not one per record
+    assert len(calls) == 1 + qld_fuel_memory.SAMPLE_SIZE
+
+
+def test_short_lists_are_walked_in_full(monkeypatch):
+    rows = records(qld_fuel_memory.SAMPLE_MIN_LENGTH)
+    calls = []
+    walk = qld_fuel_memory._deep_sizeof
+    monkeypatch.setattr(qld_fuel_memory, '_deep_sizeof', lambda obj, seen: calls.append(obj) or walk(obj, seen))
+
+    assert deep_sizeof(rows) > deep_sizeof(rows[:-1])
+    assert len(calls) == 2
+
+
+def test_views_count_their_own_bytes_not_the_base():
+    base = np.zeros(100_000, dtype=np.int64)
+    view = base[:10]
+
+    assert deep_sizeof(view) < 1000
+    assert deep_sizeof(view) >= view.nbytes
+    # A base and a view of it are not counted twice
+    assert deep_sizeof([base, view]) < base.nbytes + 1000
+
+
+def test_excluded_structures_are_not_counted():
+    shared = np.zeros(10_000)
+    assert deep_sizeof({'a': shared}, exclude=[shared]) < 1000
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for memory-budgeted month partitions
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+from qld_fuel_dataset import FuelPriceDataset, write_month
+from qld_fuel_partitions import MonthPartitionStore
+
+pytest.importorskip('pyarrow')
+
+MONTHS = [(2025, 1), (2025, 2), (2025, 3)]
+
+
+@pytest.fixture
+def dataset(tmp_path, make_changes):
+    for year, month in MONTHS:
+        changes = make_changes([(site_id, fuel_type, f'{year}-{month:02d}-{day:02d} 08:00:00', 1.80 + day / 100)
+                                for site_id in (1, 2, 3) for fuel_type in ('Diesel', 'Unleaded')
+                                for day in range(1, 21)])
+        write_month(str(tmp_path), year, month, changes)
+    return FuelPriceDataset(str(tmp_path))
+
+
+def test_hot_month_is_pinned_and_cold_months_evicted(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=1, hot_months=1)
+    assert store.pinned == {(2025, 3)}
+    assert len(store.hot_frame()) == 120
+
+    store.get_month(2025, 1)
+    store.get_month(2025, 2)
+    # Over budget: every unpinned month is evicted, the pinned one stays
+    assert list(store.resident) == [(2025, 3)]
+    assert store.stats['evictions'] == 2
+
+
+def test_least_recently_used_month_is_evicted_first(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=0, hot_months=0)
+    month_bytes = {month: store.get_month(*month).memory_usage(index=True, deep=True).sum() for month in MONTHS}
+    store.budget_bytes = month_bytes[(2025, 1)] + month_bytes[(2025, 2)]
+    store.resident.clear()
+
+    store.get_month(2025, 1)
+    store.get_month(2025, 2)
+    store.get_month(2025, 1)
+    store.get_month(2025, 3)
+    assert list(store.resident) == [(2025, 1), (2025, 3)]
+
+
+def test_concurrent_misses_read_the_month_once(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=0)
+    release, reads = threading.Event(), []
+    read_month = dataset.read_month
+
+    def slow_read(year, month):
+        reads.append((year, month))
+        release.wait(5)
+        return read_month(year, month)
+
+    dataset.read_month = slow_read
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_month(2025, 2))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert reads == [(2025, 2)]
+    assert len(results) == 8 and all(frame is results[0] for frame in results)
+    assert (store.stats['misses'], store.stats['loads'], store.stats['hits']) == (1, 1, 7)
+
+
+def test_load_error_is_not_cached(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=0)
+
+    def broken(year, month):
+        raise OSError('disk gone')
+
+    dataset.read_month = broken
+    assert store.get_month(2025, 1).empty
+    assert store.stats['load_errors'] == 1 and (2025, 1) not in store.resident
+
+
+def test_query_spans_months_and_filters(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=1)
+    df = store.query('2025-01-15', '2025-02-05', fuel_types=['Diesel'], suburb='Southport')
+    assert set(df['site_id']) == {1, 2} and set(df['fuel_type']) == {'Diesel'}
+    assert df['transaction_date'].is_monotonic_decreasing
+    # Jan 15-20 and Feb 1-4; the 08:00 change on Feb 5 is after the end instant
+    assert str(df['transaction_date'].min()) == '2025-01-15 08:00:00'
+    assert str(df['transaction_date'].max()) == '2025-02-04 08:00:00'
+    assert len(df) == 2 * (6 + 4)
+
+
+def test_select_uses_one_cached_index_per_month(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=1)
+    df = store.select(start=pd.Timestamp('2025-01-15'), end=pd.Timestamp('2025-02-05'), fuel_type=['Diesel'],
+                      suburb=['Southport'])
+    assert len(df) == 2 * (6 + 4) and df['transaction_date'].is_monotonic_decreasing
+
+    index = store.indexes[(2025, 1)]
+    assert store.select(start=pd.Timestamp('2025-01-15'), end=pd.Timestamp('2025-01-31')).shape[0] == 6 * 6
+    assert store.indexes[(2025, 1)] is index
+    assert store.select(end=pd.Timestamp('2025-02-28'), suburb=['Nowhere']).empty
+
+
+def test_indexes_are_evicted_with_their_month(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=1, hot_months=1)
+    store.select(start=pd.Timestamp('2025-01-01'), end=pd.Timestamp('2025-01-31'))
+    assert (2025, 1) not in store.resident and (2025, 1) not in store.indexes
+
+
+def test_carried_prices_are_the_last_change_before_the_hot_months(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=1)
+    carried = store.carried_prices()
+
+    assert store.hot_start() == pd.Timestamp('2025-03-01')
+    assert len(carried) == 6
+    assert set(carried['transaction_date'].astype(str)) == {'2025-02-20 08:00:00'}
+    assert carried['price_dollars'].round(2).eq(2.00).all()
+
+
+def test_nothing_is_carried_into_the_oldest_month(dataset):
+    store = MonthPartitionStore(dataset, budget_bytes=2**30, hot_months=3)
+    assert store.hot_start() == pd.Timestamp('2025-01-01')
+    assert store.carried_prices().empty
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for retail price-cycle detection
+"""
+
+import pytest
+
+from qld_fuel_price_cycles import PriceCycleAnalysis
+from qld_fuel_price_history import PriceHistoryIndex
+
+
+@pytest.fixture
+def analyse(make_changes):
+    def build(changes, **kwargs):
+        return PriceCycleAnalysis(PriceHistoryIndex(make_changes(changes)), **kwargs)
+    return build
+
+
+def station(analysis, site_id, fuel_type='Unleaded'):
+    stations = analysis.stations
+    return stations[(stations['site_id'] == site_id) & (stations['fuel_type'] == fuel_type)].iloc[0]
+
+
+def test_detects_restorations_and_undercuts(analyse):
+    analysis = analyse([
+        (1, 'Unleaded', '2025-01-01', 1.80),
+        (1, 'Unleaded', '2025-01-02', 2.05),  # restoration
+        (1, 'Unleaded', '2025-01-03', 2.02),
+        (1, 'Unleaded', '2025-01-04', 1.99),
+        (1, 'Unleaded', '2025-01-08', 2.20),  # restoration
+        (1, 'Unleaded', '2025-01-09', 2.18),
+        (1, 'Unleaded', '2025-01-10', 2.00),  # a 18c fall is not an undercut step
+    ])
+    row = station(analysis, 1)
+    assert (row['restorations'], row['undercuts']) == (2, 3)
+    assert row['cycle_days'] == pytest.approx(6.0)
+    assert row['peak_price'] == pytest.approx(2.20) and row['drop_since_restoration'] == pytest.approx(0.20)
+
+
+@pytest.mark.parametrize('before, after, undercut', [
+    (2.00, 1.95, True),
+    (2.05, 2.00, True),
+    (1.95, 1.90, True),
+    (2.00, 1.949, False),
+    (2.00, 2.00, False),
+])
+def test_undercut_threshold_is_inclusive_in_feed_units(analyse, before, after, undercut):
+    analysis = analyse([(1, 'Unleaded', '2025-01-01', before), (1, 'Unleaded', '2025-01-02', after)])
+    assert station(analysis, 1)['undercuts'] == int(undercut)
+
+
+@pytest.mark.parametrize('before, after, restored', [
+    (1.90, 1.98, True),
+    (2.10, 2.18, True),
+    (1.90, 1.979, False),
+])
+def test_restoration_threshold_is_inclusive_in_feed_units(analyse, before, after, restored):
+    analysis = analyse([(1, 'Unleaded', '2025-01-01', before), (1, 'Unleaded', '2025-01-02', after)])
+    assert station(analysis, 1)['restorations'] == int(restored)
+
+
+def test_phases(analyse):
+    analysis = analyse([
+        # Restored on the last day: restoration
+        (1, 'Unleaded', '2025-01-01', 1.80),
+        (1, 'Unleaded', '2025-01-20', 2.05),
+        # Restored five days ago and undercut since: undercutting
+        (2, 'Unleaded', '2025-01-01', 1.80),
+        (2, 'Unleaded', '2025-01-15', 2.05),
+        (2, 'Unleaded', '2025-01-17', 1.99),
+        # Never restored: unknown
+        (3, 'Unleaded', '2025-01-01', 1.90),
+        (3, 'Unleaded', '2025-01-10', 1.88),
+    ])
+    assert [station(analysis, site_id)['phase'] for site_id in (1, 2, 3)] == ['restoration', 'undercutting', 'unknown']
+
+
+def test_summary_by_suburb_and_tie_break(analyse):
+    analysis = analyse([
+        (1, 'Unleaded', '2025-01-01', 1.80),
+        (1, 'Unleaded', '2025-01-20', 2.05),
+        (2, 'Unleaded', '2025-01-01', 1.90),
+        (2, 'Unleaded', '2025-01-10', 1.88),
+        (3, 'Unleaded', '2025-01-01', 1.90),
+    ])
+    summary = {row['suburb']: row for row in analysis.summarize('suburb')}
+    # Southport has one station restoring and one unknown: ties go to the earlier phase in PHASES
+    assert summary['Southport']['phase'] == 'restoration' and summary['Southport']['phase_share'] == 0.5
+    assert summary['Southport']['stations'] == 2 and summary['Southport']['restorations'] == 1
+    assert summary['Chermside']['phase'] == 'unknown'
+    assert summary['Chermside']['median_cycle_days'] is None
+
+    assert [row['brand'] for row in analysis.summarize('brand', fuel_type='Unleaded')] == ['Ampol', 'BP', 'Shell']
+    assert analysis.summarize('suburb', fuel_type='Diesel') == []
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for as-of price reconstruction
+"""
+
+import pandas as pd
+import pytest
+
+from qld_fuel_price_history import BOARD_COLUMNS, PriceHistoryIndex
+
+
+@pytest.fixture
+def history(make_changes):
+    return PriceHistoryIndex(make_changes([
+        (1, 'Diesel', '2025-01-01 06:00:00', 1.90),
+        (1, 'Diesel', '2025-01-03 06:00:00', 2.05),
+        (1, 'Unleaded', '2025-01-02 06:00:00', 1.80),
+        (2, 'Diesel', '2025-01-02 12:00:00', 1.95),
+        (3, 'Diesel', '2025-01-04 00:00:00', 1.85),
+    ]))
+
+
+def test_price_is_last_change_at_or_before_instant(history):
+    board = {(row['site_id'], row['fuel_type']): row['price'] for row in history.prices_at('2025-01-02 12:00:00')}
+    # Site 2's change at exactly the query instant counts; site 1's later Diesel change does not
+    assert board == {(1, 'Diesel'): 1.90, (1, 'Unleaded'): 1.80, (2, 'Diesel'): 1.95}
+
+
+def test_change_is_picked_up_after_it_happens(history):
+    board = {(row['site_id'], row['fuel_type']): row for row in history.prices_at('2025-01-10')}
+    assert board[(1, 'Diesel')]['price'] == 2.05
+    assert board[(1, 'Diesel')]['last_updated'] == '2025-01-03 06:00:00'
+    assert board[(3, 'Diesel')]['price'] == 1.85
+
+
+def test_before_first_change_is_empty(history):
+    assert history.prices_at('2024-12-31 23:59:59') == []
+
+
+def test_board_is_cheapest_first_with_site_fields(history):
+    rows = history.prices_at('2025-01-10')
+    assert [row['price'] for row in rows] == sorted(row['price'] for row in rows)
+    assert list(rows[0]) == BOARD_COLUMNS
+    assert rows[0]['site_name'] == 'Alpha Fuel' and rows[0]['brand'] == 'Shell'
+
+
+def test_filters(history):
+    assert {row['site_id'] for row in history.prices_at('2025-01-10', fuel_type='Diesel', suburb='Southport')} == {1, 2}
+    assert history.prices_at('2025-01-10', fuel_type='Hydrogen') == []
+    assert history.prices_at('2025-01-10', suburb='Nowhere') == []
+
+
+def test_timezone_aware_instant_is_converted_to_utc(history):
+    # 2025-01-02 22:00 in Brisbane is 12:00 UTC
+    at = pd.Timestamp('2025-01-02 22:00:00', tz='Australia/Brisbane')
+    assert {row['site_id'] for row in history.prices_at(at, fuel_type='Diesel')} == {1, 2}
+
+
+def test_board_columns_match_records(history):
+    board = history.board_at('2025-01-10')
+    assert list(board) == BOARD_COLUMNS
+    assert [dict(zip(BOARD_COLUMNS, row)) for row in zip(*board.values())] == history.prices_at('2025-01-10')
+
+
+def test_empty_index(make_changes):
+    history = PriceHistoryIndex(make_changes([(1, 'Diesel', '2025-01-01', 1.90)]).iloc[0:0])
+    assert history.prices_at('2025-01-10') == []
+    assert history.board_at('2025-01-10') == {name: [] for name in BOARD_COLUMNS}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental region rollups
+"""
+
+import pytest
+
+from qld_fuel_live_snapshot import LiveSnapshot
+from qld_fuel_regions import RegionRollups
+
+LEVELS = (1, 2, 3)
+
+
+@pytest.fixture
+def snapshot(live_client):
+    live_client.prices += [
+        {'SiteId': 3, 'FuelId': 2, 'Price': 1799, 'TransactionDateUtc': '2025-01-06T03:00:00'},
+        {'SiteId': 1, 'FuelId': 3, 'Price': 1999, 'TransactionDateUtc': '2025-01-06T04:00:00'},
+        {'SiteId': 3, 'FuelId': 3, 'Price': 2019, 'TransactionDateUtc': '2025-01-06T05:00:00'},
+    ]
+    snapshot = LiveSnapshot(live_client, metadata_ttl=3600, price_ttl=60)
+    snapshot.rollups = RegionRollups(snapshot)
+    snapshot.listeners.append(snapshot.rollups.apply)
+    snapshot.refresh()
+    return snapshot
+
+
+def rollup_state(rollups):
+    """Every non-empty bucket's entries and total, plus what each level reports per fuel"""
+    buckets = {(region, fuel_type): (list(bucket.entries), round(bucket.total, 6))
+               for region, fuels in rollups.buckets.items()
+               for fuel_type, bucket in fuels.items() if bucket.entries}
+    levels = {(level, fuel_type): rollups.get_level(level, fuel_type)
+              for level in LEVELS for fuel_type in ('Unleaded', 'Diesel')}
+    return buckets, levels, sorted(rollups.current)
+
+
+def rebuilt(snapshot):
+    rollups = RegionRollups(snapshot)
+    rollups.apply()
+    return rollups
+
+
+def set_price(client, site_id, fuel_id, price):
+    for row in client.prices:
+        if (row['SiteId'], row['FuelId']) == (site_id, fuel_id):
+            row['Price'] = price
+
+
+def test_incremental_price_change_matches_a_full_rebuild(snapshot, live_client):
+    set_price(live_client, 3, 2, 1929)
+    set_price(live_client, 1, 3, 1949)
+    snapshot.refresh(force=True)
+
+    assert snapshot.rollups.stats['rebuilds'] == 1
+    assert snapshot.rollups.stats['incremental_updates'] == 1
+    assert rollup_state(snapshot.rollups) == rollup_state(rebuilt(snapshot))
+
+    southport = snapshot.rollups.get_region(1, 10, 'Unleaded')['fuels']['Unleaded']
+    assert (southport['stations'], southport['min'], southport['max']) == (2, 1.859, 1.899)
+    queensland = snapshot.rollups.get_region(3, 30, 'Unleaded')['fuels']['Unleaded']
+    assert [row['site_id'] for row in queensland['cheapest']] == [2, 1, 3]
+
+
+def test_dropped_fuel_is_removed_incrementally(snapshot, live_client):
+    live_client.prices = [row for row in live_client.prices if (row['SiteId'], row['FuelId']) != (3, 3)]
+    snapshot.refresh(force=True)
+
+    assert snapshot.rollups.stats['rows_removed'] == 1
+    assert rollup_state(snapshot.rollups) == rollup_state(rebuilt(snapshot))
+    assert snapshot.rollups.get_region(1, 11, 'Diesel')['fuels'] == {}
+
+
+def test_site_moving_region_matches_a_full_rebuild(snapshot, live_client):
+    site = next(site for site in live_client.sites if site['S'] == 3)
+    site['G1'], site['G2'] = 10, 20
+    set_price(live_client, 3, 2, 1819)
+    snapshot.refresh(force=True)
+
+    assert rollup_state(snapshot.rollups) == rollup_state(rebuilt(snapshot))
+    southport = snapshot.rollups.get_region(1, 10, 'Unleaded')['fuels']['Unleaded']
+    assert [row['site_id'] for row in southport['cheapest']] == [3, 2, 1]
+    assert snapshot.rollups.get_region(1, 11)['fuels'] == {}
+    assert snapshot.rollups.get_region(2, 21)['fuels'] == {}
+    assert snapshot.rollups.get_region(3, 30, 'Unleaded')['fuels']['Unleaded']['stations'] == 3
+
+    # Later price changes keep applying against the new memberships
+    set_price(live_client, 3, 2, 1999)
+    snapshot.refresh(force=True)
+    assert rollup_state(snapshot.rollups) == rollup_state(rebuilt(snapshot))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for pre-encoded, precompressed responses
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, request
+
+import qld_fuel_rendered
+from qld_fuel_rendered import PrerenderedResponses
+
+PAYLOAD = {'prices': [{'site_id': site_id, 'price': 1.80 + site_id / 1000} for site_id in range(200)]}
+BODY = json.dumps(PAYLOAD).encode()
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    rendered = PrerenderedResponses(lambda payload: json.dumps(payload).encode())
+    rendered.add('data', PAYLOAD)
+
+    @app.route('/data')
+    def data():
+        return rendered.respond(request, 'data')
+
+    client = app.test_client()
+    client.rendered = rendered
+    return client
+
+
+def test_gzip_is_served_precompressed_with_vary_on_accept(client):
+    response = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept, Accept-Encoding'
+    assert gzip.decompress(response.get_data()) == BODY
+
+
+def test_brotli_is_preferred_when_installed(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/data', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == BODY
+
+
+def test_identity_body_is_decompressed_once(client, monkeypatch):
+    calls = []
+    decompress = gzip.decompress
+    monkeypatch.setattr(qld_fuel_rendered.gzip, 'decompress', lambda data: calls.append(1) or decompress(data))
+
+    bodies = [client.get('/data', headers={'Accept-Encoding': 'identity'}) for _ in range(3)]
+
+    assert all('Content-Encoding' not in response.headers for response in bodies)
+    assert all(response.get_data() == BODY for response in bodies)
+    assert len(calls) == 1
+    assert client.rendered.variants['data'].identity == BODY
+
+
+def test_matching_etag_returns_not_modified(client):
+    etag = client.get('/data').headers['ETag']
+    response = client.get('/data', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['Vary'] == 'Accept, Accept-Encoding'
+    assert response.get_data() == b''
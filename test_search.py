@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Tests for the autocomplete search index
+"""
+
+from qld_fuel_search import NODE_CAPACITY, SearchIndex
+
+
+def test_kind_filter_is_not_starved_by_other_kinds(make_changes):
+    # More suburbs than a node holds all start with "s"; the one station sorts below all of them
+    sites = {100 + i: {'site_name': 'Zeta Fuel', 'site_brand': 'Shell', 'address': f'{i} Road',
+                       'suburb': f'Sunny {i:03d}', 'postcode': 4000 + i, 'latitude': -27.0, 'longitude': 153.0}
+             for i in range(NODE_CAPACITY + 10)}
+    sites[999] = {'site_name': 'Sam Fuel Superstore', 'site_brand': 'Zed', 'address': '1 Road',
+                  'suburb': 'Zetland', 'postcode': 4999, 'latitude': -27.0, 'longitude': 153.0}
+    index = SearchIndex(make_changes([(site_id, 'Diesel', '2025-01-01', 1.90) for site_id in sites], sites))
+
+    assert [result['label'] for result in index.search('s', limit=5, kinds=['station'])] == ['Sam Fuel Superstore']
+    assert 'station' not in {result['kind'] for result in index.search('s', limit=5)}
+
+
+def test_prefix_then_fuzzy(make_changes):
+    index = SearchIndex(make_changes([(1, 'Diesel', '2025-01-01', 1.90), (3, 'Diesel', '2025-01-01', 1.80)]))
+    assert index.search('southport', kinds=['suburb'])[0]['match'] == 'prefix'
+    assert index.search('southprot', kinds=['suburb'])[0]['label'] == 'Southport'
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for upstream rate limiting, coalescing and response caching
+"""
+
+import threading
+
+import pytest
+
+import qld_fuel_upstream
+from qld_fuel_upstream import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitExceeded, RequestCoalescer,
+                               TokenBucketRateLimiter, TTLCache, UpstreamGuard)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(qld_fuel_upstream.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_grants_up_to_capacity_then_rejects(clock):
+    limiter = TokenBucketRateLimiter(rate=1.0, capacity=3.0, reserves={PRIORITY_INTERACTIVE: 0.0})
+
+    assert [limiter.acquire(timeout=0) for _ in range(4)] == [True, True, True, False]
+    assert limiter.stats['granted'] == 3
+    assert limiter.stats['rejected'] == 1
+
+
+def test_bucket_refills_at_rate_and_caps_at_capacity(clock):
+    limiter = TokenBucketRateLimiter(rate=2.0, capacity=4.0, reserves={PRIORITY_INTERACTIVE: 0.0})
+    for _ in range(4):
+        assert limiter.acquire(timeout=0)
+
+    clock.now += 1.0
+    assert limiter.get_status()['available_tokens'] == 2.0
+
+    clock.now += 60.0
+    assert limiter.get_status()['available_tokens'] == 4.0
+
+
+def test_background_requests_leave_the_reserve_for_interactive(clock):
+    limiter = TokenBucketRateLimiter(rate=1.0, capacity=4.0)
+
+    # Background may only spend tokens above half of capacity
+    assert [limiter.acquire(PRIORITY_BACKGROUND, timeout=0) for _ in range(3)] == [True, True, False]
+    assert [limiter.acquire(PRIORITY_INTERACTIVE, timeout=0) for _ in range(3)] == [True, True, False]
+
+
+def test_concurrent_identical_requests_share_one_call():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        return {'prices': [1]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalescer.call('prices', upstream)))
+    leader.start()
+    while coalescer.get_status()['in_flight'] == 0:
+        pass
+
+    followers = [threading.Thread(target=lambda: results.append(coalescer.call('prices', upstream)))
+                 for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while coalescer.in_flight['prices'].waiters < 4:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'prices': [1]}] * 5
+    assert coalescer.get_status() == {'in_flight': 0, 'leaders': 1, 'coalesced': 4}
+
+
+def test_coalesced_callers_receive_the_leaders_error():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    errors = []
+
+    def upstream():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    def call():
+        try:
+            coalescer.call('prices', upstream)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    while coalescer.get_status()['in_flight'] == 0:
+        pass
+    for thread in threads[1:]:
+        thread.start()
+    while coalescer.in_flight['prices'].waiters < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ['upstream down'] * 3
+
+
+def test_cache_entries_expire_after_ttl(clock):
+    cache = TTLCache()
+    cache.set('prices', 'fresh', ttl=30)
+
+    clock.now += 29.9
+    assert cache.get('prices') == (True, 'fresh')
+
+    clock.now += 0.1
+    assert cache.get('prices') == (False, None)
+    assert cache.get_status() == {'entries': 0, 'hits': 1, 'misses': 1}
+
+
+def test_cache_evicts_entry_closest_to_expiry_when_full(clock):
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1, ttl=10)
+    cache.set('b', 2, ttl=60)
+    cache.set('c', 3, ttl=30)
+
+    assert set(cache.entries) == {'b', 'c'}
+    assert cache.set('d', 4, ttl=0) is None and 'd' not in cache.entries
+
+
+def test_guard_serves_cached_response_until_ttl_passes(clock):
+    guard = UpstreamGuard(rate=1.0, capacity=5.0)
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        return len(calls)
+
+    assert guard.fetch('prices', upstream, ttl=60) == 1
+    assert guard.fetch('prices', upstream, ttl=60) == 1
+    clock.now += 61
+    assert guard.fetch('prices', upstream, ttl=60) == 2
+    assert len(calls) == 2
+
+
+def test_guard_skips_cache_for_rejected_results(clock):
+    guard = UpstreamGuard(rate=1.0, capacity=5.0)
+    results = iter([None, 'ok'])
+
+    assert guard.fetch('prices', lambda: next(results), ttl=60, cacheable=lambda value: value is not None) is None
+    assert guard.fetch('prices', lambda: next(results), ttl=60, cacheable=lambda value: value is not None) == 'ok'
+
+
+def test_guard_raises_when_no_token_is_available(clock):
+    guard = UpstreamGuard(rate=1.0, capacity=1.0, acquire_timeout=0)
+
+    guard.fetch('a', lambda: 1)
+    with pytest.raises(RateLimitExceeded):
+        guard.fetch('b', lambda: 2)
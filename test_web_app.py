@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for dashboard API routes and refresh hooks
+"""
+
+import pytest
+
+import qld_fuel_web_app
+from qld_fuel_alerts import AlertEngine, AlertSubscription, QueueAlertSink
+from qld_fuel_api_complete import QLDFuelPriceAPI
+from qld_fuel_cheapest import CheapestStationIndex
+from qld_fuel_dataset import write_month
+from qld_fuel_price_history import PriceHistoryIndex
+
+
+@pytest.fixture
+def client(monkeypatch, make_changes):
+    history = PriceHistoryIndex(make_changes([
+        (1, 'Diesel', '2025-01-01 08:00:00', 1.95),
+        (2, 'Diesel', '2025-01-01 08:00:00', 1.90),
+        (3, 'Diesel', '2025-01-01 08:00:00', 1.80),
+    ]))
+    monkeypatch.setattr(qld_fuel_web_app, 'price_history', history)
+    monkeypatch.setattr(qld_fuel_web_app, 'cheapest_index', CheapestStationIndex(history))
+    return qld_fuel_web_app.app.test_client()
+
+
+@pytest.mark.parametrize('p, price', [('0', 1.80), ('50', 1.90), ('100', 1.95), ('66.7', 1.95)])
+def test_percentile_accepts_values_from_0_to_100(client, p, price):
+    response = client.get(f'/api/percentile?fuel_type=Diesel&p={p}')
+
+    assert response.status_code == 200
+    assert response.get_json()['price'] == price
+
+
+@pytest.mark.parametrize('p', ['nan', 'inf', '-inf', '-1', '100.5', 'median'])
+def test_percentile_rejects_non_finite_and_out_of_range_values(client, p):
+    response = client.get(f'/api/percentile?fuel_type=Diesel&p={p}')
+
+    assert response.status_code == 400
+    assert 'p must be' in response.get_json()['error']
+
+
+def test_first_live_board_seeds_alerts_without_emitting(monkeypatch):
+    engine = AlertEngine(QueueAlertSink())
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+    monkeypatch.setattr(qld_fuel_web_app, 'alert_engine', engine)
+    monkeypatch.setattr(qld_fuel_web_app, 'live_alerts_seeded', False)
+    board = [{'site_id': site_id, 'fuel_type': 'Diesel', 'price': price, 'suburb': 'Southport'}
+             for site_id, price in ((1, 1.70), (2, 1.90))]
+
+    qld_fuel_web_app.evaluate_live_changes(board)
+    assert engine.sink.queue.empty()
+
+    qld_fuel_web_app.evaluate_live_changes([{**board[0], 'price': 1.69}, {**board[1], 'price': 1.75}])
+    assert [engine.sink.queue.get_nowait()['site_id']] == [2]
+    assert engine.sink.queue.empty()
+
+
+def test_first_historical_load_seeds_replay_alerts(monkeypatch, make_changes):
+    engine = AlertEngine(QueueAlertSink())
+    engine.subscribe(AlertSubscription(fuel_type='Diesel', threshold=1.80, suburb='Southport'))
+    monkeypatch.setattr(qld_fuel_web_app, 'alert_engine', engine)
+    monkeypatch.setattr(qld_fuel_web_app, 'alert_watermark', None)
+    history = [(1, 'Diesel', '2025-01-01 08:00:00', 1.90), (1, 'Diesel', '2025-01-02 08:00:00', 1.70)]
+
+    qld_fuel_web_app.evaluate_new_changes(make_changes(history))
+    assert engine.sink.queue.empty()
+
+    # A further dip at a station already below the threshold stays quiet; a new one alerts
+    qld_fuel_web_app.evaluate_new_changes(make_changes(history + [(1, 'Diesel', '2025-01-03 08:00:00', 1.65),
+                                                                  (2, 'Diesel', '2025-01-03 09:00:00', 1.75)]))
+    assert [engine.sink.queue.get_nowait()['site_id']] == [2]
+    assert engine.sink.queue.empty()
+
+
+@pytest.fixture
+def dataset_app(tmp_path, monkeypatch, make_changes):
+    """The web app loaded from a two-month dataset with only February hot"""
+    pytest.importorskip('pyarrow')
+    write_month(str(tmp_path), 2025, 1, make_changes([(1, 'Diesel', '2025-01-10 08:00:00', 1.80),
+                                                      (2, 'Diesel', '2025-01-05 08:00:00', 1.90)]))
+    write_month(str(tmp_path), 2025, 2, make_changes([(2, 'Diesel', '2025-02-03 08:00:00', 1.85)]))
+    monkeypatch.setenv('QLD_FUEL_DATASET_DIR', str(tmp_path))
+    monkeypatch.setenv('QLD_FUEL_HISTORY_MONTHS', '1')
+    # Every global update_data_cache replaces, so the test leaves the module as it found it
+    for name in ('fuel_data_cache', 'fuel_data_frame', 'last_update_time', 'price_history', 'hot_window_start',
+                 'price_cycles', 'cheapest_index', 'search_index', 'rendered_responses', 'filter_index',
+                 'month_store', 'alert_engine', 'alert_watermark'):
+        monkeypatch.setattr(qld_fuel_web_app, name, getattr(qld_fuel_web_app, name))
+    monkeypatch.setattr(qld_fuel_web_app, 'month_store', None)
+    monkeypatch.setattr(qld_fuel_web_app, 'api_client', QLDFuelPriceAPI())
+
+    qld_fuel_web_app.update_data_cache()
+    return qld_fuel_web_app.app.test_client()
+
+
+@pytest.mark.parametrize('at, expected', [
+    ('2025-01-31T00:00:00', {1: 1.80, 2: 1.90}),
+    # Early in the hot month: site 1 last changed in January
+    ('2025-02-02T00:00:00', {1: 1.80, 2: 1.90}),
+    ('2025-02-04T00:00:00', {1: 1.80, 2: 1.85}),
+])
+def test_prices_at_carries_prices_across_the_hot_month_boundary(dataset_app, at, expected):
+    response = dataset_app.get(f'/api/prices?at={at}&fuel_type=Diesel&layout=records')
+
+    assert response.status_code == 200
+    assert {row['site_id']: row['price'] for row in response.get_json()['prices']} == expected
+
+
+def test_cheapest_includes_stations_unchanged_in_the_hot_month(dataset_app):
+    stations = dataset_app.get('/api/cheapest?fuel_type=Diesel').get_json()
+    assert [station['site_id'] for station in stations] == [1, 2]
+
+
+def test_export_within_the_hot_month_uses_the_hot_index(dataset_app):
+    rows = dataset_app.get('/api/export?format=json&start=2025-02-01').get_json()
+    assert [row['site_id'] for row in rows] == [2]